@@ -1,15 +1,34 @@
 import os
 import sys
+import hashlib
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import numpy as np
+from scipy.spatial import cKDTree
 import metview as mv 
+import Verif_Functions as vf
 
 ########################################################################################
 # CODE DESCRIPTION
 # 01_Compute_Count_EM_OBS_Exceeding_VRT.py computes the count of ensemble members and 
-# observations exceeding the considered verifying rainfall threshold. 
-# Code runtime: the script can take up to 3 days to run in serial. It is recommended to run separate months 
-# in parallel to take down the runtime to 6 hours. 
+# observations exceeding the considered verifying rainfall threshold. It also saves the daily joint histogram 
+# of the counts of ensemble members and observations exceeding the VRT, which is the only information needed 
+# to compute the scores in the following scripts. The counts and the histograms are appended to a single store per 
+# forecasting system and VRT (see "append_store" in Verif_Functions.py), instead of being saved in one file per 
+# base date and step. The counts of ensemble members are stored as uint8 and the observations as packed bits.
+# The (forecasting system, base date, StepF) space is split into tasks (one per forecasting system and base date, 
+# with the StepFs still to compute), which are run on a pool of persistent workers. The tasks whose counts are 
+# already in the stores for all VRTs are skipped, so the script can be re-run to complete an interrupted run.
+# Within each task, the forecasts for the next StepFs are read in a background thread while the current StepF is
+# processed, and the counts are saved by another background thread, so that I/O and computations overlap.
+# The forecasts are decoded in blocks of ensemble members, and only their values at the observations' locations are
+# kept, so that the memory used by each worker for the decoded members is bounded by a user-set cap. Optionally, the 
+# forecasts and observations at the stations are also saved in a compressed cube (see "append_cube" in 
+# Verif_Functions.py), from which the counts for new VRTs can be computed without reading the raw forecasts again.
+# Code runtime: the script can take up to 3 days to run in serial. 
 
 # INPUT PARAMETERS DESCRIPTION
 # DateS (date, in format YYYYMMDD): start date of the considered verification period.
@@ -20,10 +39,23 @@ import metview as mv
 # Acc (integer, in hours): rainfall accumulation to consider.
 # VRT_list (list of floats, from 0 to infinite, in mm): list of verifing rainfall events (VRT).
 # SystemFC_list (list of strings): list of names of forecasting systems to consider.
+# Note: the StepFs (StepF_Start, StepF_Final, Disc_Step), VRT_list and SystemFC_list can be overridden by the optional 
+# 3rd, 4th and 5th command-line arguments (comma-separated, e.g. "12,246,6" "0.2,10,50" "ENS,ecPoint_SingleWT"), so 
+# that other scripts (e.g. 17_Compute_Incremental_Update_Poisson_BS.py) can compute the counts for their own lists.
 # Git_repo (string): repository's local path.
 # DirIN_FC (string): relative path of the directory containing the rainfall forecasts.
 # DirIN_OBS (string): relative path containing the rainfall observations.
-# DirOUT (string): relative path of the directory containing the counts.
+# DirOUT (string): relative path of the directory containing the stores of the counts.
+# DirOUT_Index (string): relative path of the directory containing the cached indexes of the nearest grid-points to the observations.
+# DirOUT_OBS (string): relative path of the directory containing the inventory of the rainfall observations.
+# NumWorkers (integer, from 1 to infinite): number of worker processes (by default, the number of cores available to the job).
+# NumPrefetch (integer, from 0 to infinite): number of StepFs, after the one being processed, whose forecasts are read in advance.
+# MaxQueue_OUT (integer, from 1 to infinite): maximum number of records of counts waiting to be saved.
+# BlockEM (integer, from 1 to infinite): maximum number of ensemble members decoded at once.
+# MemCap_MB (integer, in MB): maximum memory used by each worker to hold the decoded block of ensemble members. It does not include the grid-point coordinates and the KD-tree built (once per grid geometry) when the nearest grid-points to a new station set are computed.
+# Save_Cube (boolean): if True, the forecasts and observations at the stations are also saved in the cube.
+# Cube_Scale (integer, from 1 to infinite): number of quantisation steps per mm of the forecasts saved in the cube.
+# DirOUT_Cube (string): relative path of the directory containing the cubes of the forecasts and observations at the stations.
 
 # INPUT PARAMETERS
 DateS = sys.argv[1]
@@ -38,78 +70,297 @@ Git_repo="/ec/vol/ecpoint_dev/mofp/Papers_2_Write/Verif_ecPoint_SingleWT"
 DirIN_FC = "Data/Raw/FC"
 DirIN_OBS = "Data/Raw/OBS"
 DirOUT = "Data/Compute/01_Count_EM_OBS_Exceeding_VRT"
+DirOUT_Index = "Data/Compute/01_Count_EM_OBS_Exceeding_VRT/Grid_Index"
+DirOUT_OBS = "Data/Compute/01_Count_EM_OBS_Exceeding_VRT/OBS_Inventory"
+NumWorkers = len(os.sched_getaffinity(0))
+NumPrefetch = 2
+MaxQueue_OUT = 16
+BlockEM = 99
+MemCap_MB = 512
+Save_Cube = False
+Cube_Scale = 100
+DirOUT_Cube = "Data/Compute/01_Count_EM_OBS_Exceeding_VRT/Cube"
 ########################################################################################
 
-# Converting the strings into datetime objects
-DateS = datetime.strptime(DateS, "%Y%m%d")
-DateF = datetime.strptime(DateF, "%Y%m%d")
 
-# Computing the counts for a specific forecasting system
-for SystemFC in SystemFC_list:
+# Reading the optional external input variables
+# Note: they are read at import, so the spawned workers (which receive the same command-line arguments) see the same lists.
+if len(sys.argv) > 3:
+      StepF_Start, StepF_Final, Disc_Step = [int(elem) for elem in sys.argv[3].split(',')]
+if len(sys.argv) > 4:
+      VRT_list = []
+      for elem in sys.argv[4].split(','):
+            if float(elem) < 1:
+                  VRT_list.append(float(elem))
+            else:
+                  VRT_list.append(int(elem))
+if len(sys.argv) > 5:
+      SystemFC_list = sys.argv[5].split(',')
 
-      # Computing the counts for a specific date
-      TheDate = DateS
-      while TheDate <= DateF:
 
-            # Computing the counts for a specific lead time
-            for StepF in range(StepF_Start, (StepF_Final+1), Disc_Step):
+# COSTUME FUNCTIONS
+
+##################################################################
+# Indexes of the nearest grid-points to the observations' locations #
+##################################################################
+
+# Note: the nearest grid-point to each station depends only on the grid geometry and on the station set. Thus, the 
+# flat indexes of the nearest grid-points are computed only once for each (grid geometry, station set) pair, and they 
+# are cached on disk in files whose name contains the identifiers of the grid geometry and of the station set. The 
+# grid geometry is identified by the MD5 checksum of the grid section of the GRIB message (computed by ecCodes from 
+# the encoded metadata), so the grid-point coordinates are decoded only when new indexes are computed.
+Index_dict = {} # in-memory cache of the indexes already read or computed
+Tree_dict = {} # in-memory cache of the KD-trees built for each grid geometry
+Metview_Lock = threading.Lock() # metview is not thread-safe, so its calls within a process are serialised
+
+def hash_lat_lon(lats, lons):
+      lats = np.ascontiguousarray(lats, dtype=np.float64)
+      lons = np.ascontiguousarray(lons, dtype=np.float64)
+      return hashlib.sha1(lats.tobytes() + lons.tobytes()).hexdigest()[:16]
+
+def lat_lon_2_xyz(lats, lons):
+      lats = np.radians(lats)
+      lons = np.radians(lons)
+      return np.column_stack([np.cos(lats) * np.cos(lons), np.cos(lats) * np.sin(lons), np.sin(lats)])
+
+def nearest_gridpoint_index(field, lats_obs, lons_obs, DirIndex):
+
+      # Defining the name of the file containing the cached indexes
+      with Metview_Lock:
+            Hash_Grid = mv.grib_get_string(field, "md5GridSection")[:16]
+      Hash_OBS = hash_lat_lon(lats_obs, lons_obs)
+      FileIndex = DirIndex + "/Index_" + Hash_Grid + "_" + Hash_OBS + ".npy"
+      
+      # Reading the indexes if they were already computed
+      if FileIndex in Index_dict:
+            return Index_dict[FileIndex]
+      if os.path.isfile(FileIndex):
+            Index_dict[FileIndex] = np.load(FileIndex)
+            return Index_dict[FileIndex]
+
+      # Computing the indexes with a nearest-neighbour search on the unit sphere (the chord distance has the same 
+      # ordering as the great-circle distance)
+      if Hash_Grid not in Tree_dict:
+            with Metview_Lock:
+                  lats_grid, lons_grid = mv.latitudes(field), mv.longitudes(field)
+            Tree_dict[Hash_Grid] = cKDTree(lat_lon_2_xyz(lats_grid, lons_grid))
+      ind_gp = Tree_dict[Hash_Grid].query(lat_lon_2_xyz(lats_obs, lons_obs))[1].astype(np.int64)
+
+      # Saving the indexes (the temporary file avoids that parallel runs read a partially written file)
+      if not os.path.exists(DirIndex):
+            os.makedirs(DirIndex, exist_ok=True)
+      FileIndex_temp = FileIndex + "." + str(os.getpid()) + ".tmp"
+      with open(FileIndex_temp, "wb") as f:
+            np.save(f, ind_gp)
+      os.replace(FileIndex_temp, FileIndex)
+      Index_dict[FileIndex] = ind_gp
+      
+      return ind_gp
+
+#####################################################
+# Reading and de-accumulation of the rainfall forecasts #
+#####################################################
+
+# Note: the forecasts are decoded in blocks of ensemble members, and only their values at the observations' locations
+# are kept, in preallocated arrays of ensemble members x stations. The size of the blocks is limited so that a block 
+# fits in the memory cap. The blocks are decoded one after the other under the metview lock (metview is not 
+# thread-safe, so decoding the blocks in parallel threads would not be faster). A forecast file can be needed for 
+# more than one valid time (e.g. the ENS cumulative fields used as end and as beginning of consecutive accumulation 
+# periods), so the values are extracted at once for the stations of all the valid times that need the file. The 
+# forecasts for ENS are cumulated from the beginning of the forecast. Thus, the rainfall accumulated over a period 
+# (StepS, StepF) is the difference between the cumulative forecasts at StepF and StepS.
+def files_FC(SystemFC, TheDate, StepF):
+      
+      StepS = StepF - Acc
+      if SystemFC == "ENS":
+            FileIN_FC_temp1= Git_repo + "/" + DirIN_FC + "/" + SystemFC + "/" + TheDate.strftime("%Y%m%d%H") + "/tp_" + TheDate.strftime("%Y%m%d") + "_" + TheDate.strftime("%H") + "_" + f"{StepS:03d}" + ".grib"
+            FileIN_FC_temp2= Git_repo + "/" + DirIN_FC + "/" + SystemFC + "/" + TheDate.strftime("%Y%m%d%H") + "/tp_" + TheDate.strftime("%Y%m%d") + "_" + TheDate.strftime("%H") + "_" + f"{StepF:03d}" + ".grib"
+            return [FileIN_FC_temp1, FileIN_FC_temp2]
+      elif SystemFC == "ecPoint_MultipleWT" or SystemFC == "ecPoint_SingleWT":
+            FileIN_FC_temp= Git_repo + "/" + DirIN_FC + "/" + SystemFC + "/" + TheDate.strftime("%Y%m%d%H") + "/Pt_BiasCorr_RainPERC/Pt_BC_PERC_" + f"{Acc:03d}" + "_" + TheDate.strftime("%Y%m%d") + "_" + TheDate.strftime("%H") + "_" + f"{StepF:03d}" + ".grib"
+            return [FileIN_FC_temp]
+
+def read_FC_at_obs(FileIN_FC, OBS_dict):
+
+      if not os.path.isfile(FileIN_FC):
+            return None
+      with Metview_Lock:
+            tp = mv.read(FileIN_FC)
+            NumEM = len(tp)
+            NumGridPoints = mv.grib_get_long(tp[0], "numberOfDataPoints")
+
+      # Computing the indexes of the nearest grid-points to the observations for each valid time (with the StepFs as keys)
+      ind_gp_dict = {StepF: nearest_gridpoint_index(tp[0], obs["lat"], obs["lon"], Git_repo + "/" + DirOUT_Index) for StepF, obs in OBS_dict.items()}
+      tp_at_obs_dict = {StepF: np.empty([NumEM, len(ind_gp)]) for StepF, ind_gp in ind_gp_dict.items()}
+
+      # Decoding the ensemble members in blocks (one at a time, as metview is not thread-safe), and gathering their values at the observations' locations
+      # Note: each value is decoded as float64 (8 bytes).
+      NumEM_Block = max(1, min(BlockEM, (MemCap_MB * 2**20) // (NumGridPoints * 8)))
+      for ind_EM_S in range(0, NumEM, NumEM_Block):
+            ind_EM_F = min(ind_EM_S + NumEM_Block, NumEM)
+            with Metview_Lock:
+                  tp_block = np.atleast_2d(mv.values(tp[ind_EM_S:ind_EM_F]))
+            for StepF, ind_gp in ind_gp_dict.items():
+                  tp_at_obs_dict[StepF][ind_EM_S:ind_EM_F] = tp_block[:, ind_gp]
+      
+      return tp_at_obs_dict
+
+def deaccumulate_ENS(tp_S, tp_F):
+      
+      tp = np.subtract(tp_F, tp_S)
+      tp *= 1000
+      
+      return tp
+
+#####################################
+# Asynchronous saving of the counts #
+#####################################
+
+# Note: the records of counts (or of the cube) are put in a bounded queue, together with the function that saves them, 
+# and saved by a background thread. The value None in the queue stops the thread. Any error raised while saving is 
+# stored and raised again when the thread is joined.
+def save_counts_queue(Queue_OUT, Error_list):
+      while True:
+            Record = Queue_OUT.get()
+            if Record is None:
+                  break
+            try:
+                  Function_Save, Args = Record
+                  Function_Save(*Args)
+            except Exception as Error:
+                  Error_list.append(Error)
+
+##########################################
+# Computation of the counts for one task #
+##########################################
+
+# Note: each task computes the counts for one forecasting system and one base date, for a list of StepFs. The
+# workers are persistent processes, so the libraries (e.g. metview) are imported only once per worker, and the 
+# in-memory caches (e.g. the indexes of the nearest grid-points) are kept warm between the tasks.
+def file_store_counts(SystemFC, VRT):
+      return Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+
+def file_store_cube(SystemFC):
+      return Git_repo + "/" + DirOUT_Cube + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/Cube_" + f"{Acc:02d}" + "h_" + SystemFC
+
+def init_worker(FileStore_OBS):
+      global Store_OBS
+      Store_OBS = vf.open_store(FileStore_OBS)
+
+def compute_counts_task(SystemFC, TheDate, StepF_list):
+
+      # Reading the rainfall observations for the valid time of each StepF, and considering only the StepFs for which the observations exist
+      OBS_dict = {}
+      for StepF in StepF_list:
+            ValidTimeF_OBS = int((TheDate + timedelta(hours=StepF)).strftime("%Y%m%d%H"))
+            if (ValidTimeF_OBS, Acc) in Store_OBS["lookup"]:
+                  OBS_dict[StepF] = vf.read_OBS(Store_OBS, ValidTimeF_OBS, Acc)
+      StepF_list = [StepF for StepF in StepF_list if StepF in OBS_dict]
+
+      # Initializing the rolling cache of the forecasts at the observations' locations (as futures of the prefetcher, with 
+      # the file names as keys), and the thread that saves the counts asynchronously
+      # Note: the prefetcher uses a single thread, and all the metview calls are serialised by the metview lock. Each 
+      # forecast is kept in the cache while a following StepF still needs it, so that each file is decoded only once.
+      Cache_FC = {}
+      Queue_OUT = queue.Queue(maxsize=MaxQueue_OUT)
+      Error_list = []
+      Writer = threading.Thread(target=save_counts_queue, args=(Queue_OUT, Error_list))
+      Writer.start()
+
+      try:
+            with ThreadPoolExecutor(max_workers=1) as Prefetcher:
+
+                  # Computing the counts for a specific lead time
+                  for ind_StepF in range(len(StepF_list)):
                   
-                  # Computing the beginning of the accumulation period
-                  StepS = StepF - Acc
+                        # Computing the beginning of the accumulation period
+                        StepF = StepF_list[ind_StepF]
+                        StepS = StepF - Acc
                   
-                  print("Computing the counts for " + SystemFC + ", FC: " + TheDate.strftime("%Y-%m-%d") + " at " + TheDate.strftime("%H") + " UTC, (t+" + str(StepS) + ",t+", str(StepF) + ")")
+                        print("Computing the counts for " + SystemFC + ", FC: " + TheDate.strftime("%Y-%m-%d") + " at " + TheDate.strftime("%H") + " UTC, (t+" + str(StepS) + ",t+", str(StepF) + ")")
                   
-                  # Reading the rainfall forecasts
-                  tp = [] # variable needed to asses whether the forecasts for the considered date exist
-                  if SystemFC == "ENS": # Note: converting the forecasts in accumulated rainfall over the considered period. Converting also their units from m to mm.
-                        FileIN_FC_temp1= Git_repo + "/" + DirIN_FC + "/" + SystemFC + "/" + TheDate.strftime("%Y%m%d%H") + "/tp_" + TheDate.strftime("%Y%m%d") + "_" + TheDate.strftime("%H") + "_" + f"{StepS:03d}" + ".grib"
-                        FileIN_FC_temp2= Git_repo + "/" + DirIN_FC + "/" + SystemFC + "/" + TheDate.strftime("%Y%m%d%H") + "/tp_" + TheDate.strftime("%Y%m%d") + "_" + TheDate.strftime("%H") + "_" + f"{StepF:03d}" + ".grib"
-                        if os.path.isfile(FileIN_FC_temp1) and os.path.isfile(FileIN_FC_temp2):
-                              tp1 = mv.read(FileIN_FC_temp1)
-                              tp2 = mv.read(FileIN_FC_temp2)
-                              tp = (tp2-tp1) * 1000
-                  elif SystemFC == "ecPoint_MultipleWT" or SystemFC == "ecPoint_SingleWT": # Note: the forecasts are already accumulated over the considered period, and are already expressed in mm. The forecasts are stored in files whose name indicates the end of the accumulated period.
-                        FileIN_FC_temp= Git_repo + "/" + DirIN_FC + "/" + SystemFC + "/" + TheDate.strftime("%Y%m%d%H") + "/Pt_BiasCorr_RainPERC/Pt_BC_PERC_" + f"{Acc:03d}" + "_" + TheDate.strftime("%Y%m%d") + "_" + TheDate.strftime("%H") + "_" + f"{StepF:03d}" + ".grib"
-                        if os.path.isfile(FileIN_FC_temp):
-                              tp = mv.read(FileIN_FC_temp)
-
-                  # Checking that the rainfall forecasts exist for the considered date.
-                  if len(tp) != 0:
+                        # Removing from the cache the forecasts that are not needed anymore, and prefetching the forecasts for the current and the following StepFs
+                        Files_Needed = [FileIN for StepF_temp in StepF_list[ind_StepF:] for FileIN in files_FC(SystemFC, TheDate, StepF_temp)]
+                        for FileIN in [FileIN for FileIN in Cache_FC if FileIN not in Files_Needed]:
+                              del Cache_FC[FileIN]
+                        for StepF_temp in StepF_list[ind_StepF:(ind_StepF + NumPrefetch + 1)]:
+                              for FileIN in files_FC(SystemFC, TheDate, StepF_temp):
+                                    if FileIN not in Cache_FC:
+                                          OBS_FileIN = {StepF_user: OBS_dict[StepF_user] for StepF_user in StepF_list[ind_StepF:] if FileIN in files_FC(SystemFC, TheDate, StepF_user)}
+                                          Cache_FC[FileIN] = Prefetcher.submit(read_FC_at_obs, FileIN, OBS_FileIN)
+
+                        # Reading the rainfall forecasts at the observations' locations (as an array of ensemble members x stations)
+                        FC_list = [Cache_FC[FileIN].result() for FileIN in files_FC(SystemFC, TheDate, StepF)]
+
+                        # Checking that the rainfall forecasts exist for the considered date.
+                        if all(FC is not None for FC in FC_list):
                         
-                        NumEM = int(mv.count(tp))
+                              if SystemFC == "ENS": # Note: converting the forecasts in accumulated rainfall over the considered period. Converting also their units from m to mm.
+                                    tp_at_obs = deaccumulate_ENS(FC_list[0][StepF], FC_list[1][StepF])
+                              else: # Note: the ecPoint forecasts are already accumulated over the considered period, and are already expressed in mm. The forecasts are stored in files whose name indicates the end of the accumulated period.
+                                    tp_at_obs = FC_list[0][StepF]
+                              NumEM = tp_at_obs.shape[0]
+                              obs = OBS_dict[StepF]
 
-                        # Defining the valid time for the accumulation period
-                        ValidTimeF = TheDate + timedelta(hours=StepF)
+                              # Saving asynchronously the forecasts and observations at the stations in the cube
+                              if Save_Cube:
+                                    Queue_OUT.put((vf.append_cube, (file_store_cube(SystemFC), int(TheDate.strftime("%Y%m%d%H")), StepF, tp_at_obs, obs["value"], Cube_Scale)))
 
-                        # Computing the counts for a specific date
-                        FileIN_OBS_temp = Git_repo + "/" + DirIN_OBS + "/" + ValidTimeF.strftime("%Y%m%d") + "/tp" + f"{Acc:02d}" + "_obs_" + ValidTimeF.strftime("%Y%m%d%H") + ".geo"
-                        if os.path.isfile(FileIN_OBS_temp): # Checking that the rainfall observations exist for the considered date.
-                              
-                              # Reading the rainfall observations
-                              # Note: the rainfall observations are already accumulated, and are stored in files whose name indicates the end of the accumulated period.
-                              obs = mv.read(FileIN_OBS_temp)
-                              
-                              # Extracting the forecasts for the nearest grid-boxes to the observations' location
-                              tp_at_obs = []
-                              for ind_EM in range(NumEM): 
-                                    tp_at_obs.append(mv.values(mv.nearest_gridpoint(tp[ind_EM],obs)))
-                              tp_at_obs = np.array(tp_at_obs)
+                              # Counting the ensemble members exceeding all the VRTs at once, with a binary search on the sorted ensemble members
+                              # Note: the ecPoint percentiles are already sorted, while the ENS members are sorted once per station.
+                              countEM_exceeding_VRT_all = vf.count_exceeding_sorted(vf.sort_members(tp_at_obs), VRT_list)
 
                               # Computing the counts for a specific VRT
-                              for VRT in VRT_list:
-
-                                    # Counting the ensemble members exceeding the VRT, and converting the observations into a field of 1s and 0s
-                                    countEM_exceeding_VRT = np.sum((tp_at_obs >= VRT), axis=0)
-                                    countOBS_exceeding_VRT = mv.values(obs >= VRT)
-                                    
-                                    # Merging the arrays containing the counts of ensemble members and observations exceeding the VRT
-                                    count_EM_OBS_exceeding_VRT = np.vstack([countEM_exceeding_VRT, countOBS_exceeding_VRT])
-
-                                    # Saving the counts
-                                    DirOUT_temp= Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/" + str(VRT) + "/" + TheDate.strftime("%Y%m%d%H")
-                                    FileNameOUT_temp = "Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + "_" + TheDate.strftime("%Y%m%d") + "_" + TheDate.strftime("%H") + "_" + f"{StepF:03d}"
-                                    if not os.path.exists(DirOUT_temp):
-                                          os.makedirs(DirOUT_temp)
-                                    np.save(DirOUT_temp + "/" + FileNameOUT_temp, count_EM_OBS_exceeding_VRT)
-
-            TheDate += timedelta(days=1)         
\ No newline at end of file
+                              for ind_VRT in range(len(VRT_list)):
+                                    VRT = VRT_list[ind_VRT]
+
+                                    # Converting the observations into a field of 1s and 0s
+                                    countEM_exceeding_VRT = countEM_exceeding_VRT_all[ind_VRT]
+                                    countOBS_exceeding_VRT = obs["value"] >= VRT
+                              
+                                    # Saving asynchronously the counts and their daily joint histogram in the store for the considered system and VRT
+                                    Queue_OUT.put((vf.append_counts, (file_store_counts(SystemFC, VRT), int(TheDate.strftime("%Y%m%d%H")), StepF, countEM_exceeding_VRT, countOBS_exceeding_VRT, NumEM)))
+
+      finally:
+            
+            # Waiting for all the counts to be saved
+            Queue_OUT.put(None)
+            Writer.join()
+      if len(Error_list) > 0:
+            raise Error_list[0]
+
+########################################################################################
+
+
+if __name__ == "__main__":
+
+      # Converting the strings into datetime objects
+      DateS = datetime.strptime(DateS, "%Y%m%d")
+      DateF = datetime.strptime(DateF, "%Y%m%d")
+
+      # Parsing once all the rainfall observations for the considered period into their inventory
+      # Note: the rainfall observations are already accumulated, and are stored in files whose name indicates the end of the accumulated period.
+      FileStore_OBS = Git_repo + "/" + DirOUT_OBS + "/OBS_" + f"{Acc:02d}" + "h"
+      vf.ingest_OBS_period(FileStore_OBS, Git_repo + "/" + DirIN_OBS, Acc, DateS + timedelta(hours=StepF_Start), DateF + timedelta(hours=StepF_Final), Disc_Step)
+
+      # Defining the tasks for a specific forecasting system and date, skipping the StepFs whose counts are already in the stores for all VRTs (and in the cube, if saved)
+      Task_list = []
+      for SystemFC in dict.fromkeys(SystemFC_list): # Note: a forecasting system repeated in the list is considered only once
+            Store_list = [vf.open_store(file_store_counts(SystemFC, VRT)) for VRT in VRT_list]
+            if Save_Cube:
+                  Store_list.append(vf.open_store(file_store_cube(SystemFC)))
+            TheDate = DateS
+            while TheDate <= DateF:
+                  BaseDateTime = int(TheDate.strftime("%Y%m%d%H"))
+                  StepF_list = [StepF for StepF in range(StepF_Start, (StepF_Final+1), Disc_Step) if not all((BaseDateTime, StepF) in Store["lookup"] for Store in Store_list)]
+                  if len(StepF_list) > 0:
+                        Task_list.append((SystemFC, TheDate, StepF_list))
+                  TheDate += timedelta(days=1)
+      print("Computing the counts for " + str(len(Task_list)) + " tasks on " + str(NumWorkers) + " workers")
+
+      # Running the tasks on the pool of persistent workers
+      # Note: the workers are started with "spawn", so that each of them has its own metview session.
+      with ProcessPoolExecutor(max_workers=NumWorkers, mp_context=multiprocessing.get_context("spawn"), initializer=init_worker, initargs=(FileStore_OBS,)) as executor:
+            Future_list = [executor.submit(compute_counts_task, *Task) for Task in Task_list]
+            for Future in as_completed(Future_list):
+                  Future.result()
@@ -1,16 +1,21 @@
 import os
 import sys
 from datetime import datetime, timedelta
-from random import choices
-import itertools
 import numpy as np
+import Verif_Functions as vf
 
 ########################################################################################
 # CODE DESCRIPTION
 # 02_Compute_BSrel.py computes the values of the Brier Score - Reliability component (BSrel), including 
 # bootstrapped (BS) values.
-# Code Runtime: the script can take up 10 days to run in serial. It is recommended to run the code in parallel  
-# for different forecasting systems and VRT values to bring down the runtime to 1 day.
+# Note: the BSrel values are computed from the daily joint histograms of the counts of ensemble members and 
+# observations exceeding the VRT. The histograms of all the bootstrap replicates are computed with a single 
+# matrix product between the matrix with the multiplicity of the bootstrapped days and the daily histograms.
+# The bootstrapped days are drawn from seeded random streams (one per forecasting system, VRT, StepF and block of 
+# repetitions), so the bootstrapped values are reproducible, also when the computations are split across processes.
+# If a tolerance is given, the bootstrap repetitions are drawn in blocks until the confidence intervals converge (up 
+# to RepetitionsBS repetitions, and not before MinRepsBS repetitions). The repetitions not drawn are NaN, and the 
+# number of repetitions drawn is saved.
 
 # INPUT PARAMETERS DESCRIPTION
 # DateS (date, in format YYYYMMDD): start date of the considered verification period.
@@ -20,10 +25,15 @@ import numpy as np
 # Disc_Step (integer, in hours): discretization for the final steps to consider.
 # Acc (number, in hours): rainfall accumulation to consider.
 # RepetitionsBS (integer, from 0 to infinite): number of repetitions to consider in the bootstrapping.
+# SeedBS (integer, from 0 to infinite): seed of the random streams of the bootstrapping (the same seed gives the same bootstrapped values).
+# BlockBS (integer, from 1 to infinite): number of bootstrap repetitions drawn from the same random stream.
+# CL_BS (integer from 0 to 100, in percent): confidence level of the confidence intervals whose convergence stops the bootstrapping.
+# Tol_BS (float, from 0 to infinite, or None): tolerance on the change of the bounds of the confidence intervals after a new block of repetitions, below which the bootstrapping stops (None to always draw RepetitionsBS repetitions).
+# MinRepsBS (integer, from 0 to RepetitionsBS-1): minimum number of repetitions drawn before the bootstrapping can stop with Tol_BS (at CL_BS=99, the 0.5th and 99.5th percentiles are poorly estimated from only one or two blocks of repetitions).
 # VRT_list (list of floats, from 0 to infinite, in mm): list of verifing rainfall events (VRT).
 # SystemFC_list (list of strings): list of names of forecasting systems to consider.
 # Git_repo (string): repository's local path.
-# DirIN (string): relative path containing the counts of EM and OBS exceeding a certain VRT.
+# DirIN (string): relative path containing the stores of the counts of EM and OBS exceeding a certain VRT, and of their daily histograms.
 # DirOUT (string): relative path of the directory containing the BSrel values, including the bootstrapped ones.
 
 # INPUT PARAMETERS
@@ -34,6 +44,11 @@ StepF_Final = 246
 Disc_Step = 6
 Acc = 12
 RepetitionsBS = 1000
+SeedBS = 20211201
+BlockBS = 100
+CL_BS = 99
+Tol_BS = None
+MinRepsBS = 300
 VRT_list = sys.argv[1]
 SystemFC_list = sys.argv[2]
 Git_repo = "/ec/vol/ecpoint_dev/mofp/Papers_2_Write/Verif_ecPoint_SingleWT"
@@ -42,34 +57,6 @@ DirOUT = "Data/Compute/02_BSrel_BS"
 ########################################################################################
 
 
-# COSTUME FUNCTIONS
-
-#####################################
-# Brier Score - Reliability component (BSrel) #
-#####################################
-
-# Note: To compute the BSrel values, we are using the equation present in:
-# Ferro, C.A. and Fricker, T.E., 2012. A bias‐corrected decomposition of the Brier score. Quarterly Journal of the Royal Meteorological Society, 138(668), pp.1954-1960. https://doi.org/10.1002/qj.1924
-def BSrel_Ferro(count_em, count_obs, NumEM):
-
-      n = len(count_em) # sample size
-      Count_EM = np.arange(0, NumEM+1) # possible counts of ensemble members exceeding the VRT (i.e. from 0 to NumEM)
-      Prob_Thr = Count_EM/NumEM  # probability thresholds offered by the considered ensemble
-
-      Nk = np.array([len(count_em[count_em == Count_EM_k]) for Count_EM_k in Count_EM])
-      Ok = np.array([sum(count_obs[count_em == Count_EM_k]) for Count_EM_k in Count_EM])
-      
-      Ok = Ok[Nk != 0]
-      Prob_Thr = Prob_Thr[Nk != 0]
-      Nk = Nk[Nk != 0]
-      
-      BSrel = np.sum((Nk/n) * ((Prob_Thr - (Ok/Nk))**2))
-
-      return BSrel
-
-####################################################################################################
-
-
 # Reading the external input variables
 VRT_list_temp = []
 VRT_list = VRT_list.split(',')
@@ -81,6 +68,10 @@ for elem in VRT_list:
 VRT_list = VRT_list_temp
 SystemFC_list  = SystemFC_list.split(',')
 
+# Checking that the bootstrapping can stop before RepetitionsBS repetitions when a tolerance is given
+if Tol_BS is not None and MinRepsBS >= RepetitionsBS:
+      raise ValueError("MinRepsBS (" + str(MinRepsBS) + ") must be smaller than RepetitionsBS (" + str(RepetitionsBS) + ") when Tol_BS is given")
+
 # Defining the list of StepF to consider
 StepF_list = range(StepF_Start, (StepF_Final+1), Disc_Step)
 m = len(StepF_list)
@@ -100,8 +91,13 @@ for indSystemFC in range(len(SystemFC_list)):
       # Computing BSrel for a specific VRT
       for VRT in VRT_list:
 
+            # Opening the store with the counts of ensemble members and observations exceeding the VRT, and their daily histograms
+            FileStore = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+            Store = vf.open_store(FileStore)
+
             # Initializing the variable containing the BSrel values, and the bootstrapped ones
             BSrel_array = np.zeros([m, RepetitionsBS+2])
+            NumRepsBS_array = np.zeros([m, 2]) # StepF (column 0) and number of bootstrap repetitions drawn (column 1)
 
             # Computing BSrel for a specific lead time
             for ind_StepF in range(m):
@@ -111,49 +107,31 @@ for indSystemFC in range(len(SystemFC_list)):
 
                   # Storing information about the step computed
                   BSrel_array[ind_StepF, 0] = StepF
+                  NumRepsBS_array[ind_StepF, 0] = StepF
 
-                  # Reading the daily counts of ensemble members and observations exceeding the considered verifying rainfall event
-                  original_datesSTR_array = [] # list of dates for which the counts are created (not all steps might have one if the forecasts did not exist)
-                  Count_EM_original = [] # initializing the variable that will contain the counts of ensemble members exceeding the VRT for the original dates
-                  Count_OBS_original = [] # initializing the variable that will contain the counts of observations exceeding the VRT for the original dates
+                  # Reading the daily histograms of the counts of ensemble members and observations exceeding the considered verifying rainfall event
+                  Hist_original = [] # initializing the variable that will contain the daily histograms for the original dates (not all steps might have one if the forecasts did not exist)
                   TheDate = DateS
                   while TheDate <= DateF:
-                        DirIN_temp = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/" + str(VRT) + "/" + TheDate.strftime("%Y%m%d%H")
-                        FileNameIN_temp = "Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + "_" + TheDate.strftime("%Y%m%d") + "_" + TheDate.strftime("%H") + "_" + f"{StepF:03d}" + ".npy"
-                        if os.path.isfile(DirIN_temp + "/" + FileNameIN_temp): # proceed if the files exists
-                              original_datesSTR_array.append(TheDate.strftime("%Y%m%d"))
-                              Count_EM_OBS = np.load(DirIN_temp + "/" + FileNameIN_temp)
-                              Count_EM_original.append(Count_EM_OBS[0].tolist())
-                              Count_OBS_original.append(Count_EM_OBS[1].tolist())
+                        BaseDateTime = int(TheDate.strftime("%Y%m%d%H"))
+                        if (BaseDateTime, StepF) in Store["lookup"]: # proceed if the record exists
+                              Hist_original.append(vf.read_hist(Store, BaseDateTime, StepF))
                         TheDate += timedelta(days=1)
-                  Count_EM_original = np.array(Count_EM_original, dtype=object)
-                  Count_OBS_original = np.array(Count_OBS_original, dtype=object)
+                  Hist_original = np.array(Hist_original).reshape(-1, NumEM+1, 2)
 
                   # Computing BSrel for the original and the bootstrapped values
-                  for ind_repBS in range(RepetitionsBS+1):
-                        
-                        # Selecting whether to compute BSrel, AROCt, and AROCz for original or the bootstrapped values
-                        if ind_repBS == 0:  # original
-                              Count_EM = Count_EM_original
-                              Count_OBS = Count_OBS_original
-                        else:  # bootstrapped
-                              NumDays = len(original_datesSTR_array)
-                              datesBS_array = np.array(choices(population=original_datesSTR_array, k=NumDays)) # list of bootstrapped dates
-                              indBS = np.searchsorted(original_datesSTR_array, datesBS_array) # indexes of the bootstrapped dates
-                              Count_EM = Count_EM_original[indBS] # indexing the bootstrapped counts
-                              Count_OBS = Count_OBS_original[indBS] # indexing the bootstrapped counts
-
-                        # Expand the list of lists into a unique array
-                        Count_EM = np.array(list(itertools.chain.from_iterable(Count_EM.tolist())))
-                        Count_OBS = np.array(list(itertools.chain.from_iterable(Count_OBS.tolist())))
-                        
-                        # Computing BSrel
-                        BSrel = BSrel_Ferro(Count_EM, Count_OBS, NumEM)
-                        BSrel_array[ind_StepF, ind_repBS+1] = BSrel
+                  BSrel_array[ind_StepF, 1:], NumRepsBS_array[ind_StepF, 1] = vf.adaptive_BS(Hist_original, lambda Hist: vf.BSrel_Ferro(Hist, NumEM), RepetitionsBS, SeedBS, (SystemFC, VRT, StepF), BlockBS, CL_BS, Tol_BS, MinRepsBS)
 
             # Saving BSrel
             DirOUT_temp = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/BSrel/"
             FileNameOUT_temp = "BSrel_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
             if not os.path.exists(DirOUT_temp):
                   os.makedirs(DirOUT_temp)
-            np.save(DirOUT_temp + "/" + FileNameOUT_temp, BSrel_array)
\ No newline at end of file
+            np.save(DirOUT_temp + "/" + FileNameOUT_temp, BSrel_array)
+
+            # Saving the number of bootstrap repetitions drawn
+            DirOUT_temp = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/NumRepsBS/"
+            FileNameOUT_temp = "NumRepsBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+            if not os.path.exists(DirOUT_temp):
+                  os.makedirs(DirOUT_temp)
+            np.save(DirOUT_temp + "/" + FileNameOUT_temp, NumRepsBS_array)
\ No newline at end of file
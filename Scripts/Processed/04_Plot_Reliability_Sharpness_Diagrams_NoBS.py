@@ -1,12 +1,30 @@
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 import numpy as np
+import Verif_Functions as vf
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
 #########################################################################################
 # CODE DESCRIPTION
 # 04_Plot_Reliability_Sharpness_Diagrams_NoBS.py plots reliability and sharpness diagrams.
 # Code Runtime: the script can take up 2 hours to run in serial.
+# Note: the diagrams are plotted from the reliability and sharpness tables saved by
+# 12_Compute_BSrel_AROCt_AROCz_HR_FAR_Reliability_BS.py (one per forecasting system and VRT, for all StepFs). If a
+# table does not exist, or it was computed with settings different from the ones of this script (verification 
+# period, StepFs, RepetitionsBS, SeedBS, BlockBS or CL_BS, saved with the table), it is computed from the daily 
+# joint histograms of the counts saved in the stores (one bin per forecast probability k/NumEM), with the confidence
+# intervals of the observation relative frequency from the bootstrapped histograms, and saved (with its settings), 
+# so that the following runs only draw.
+# As in 12, each VRT considers the dates in its own store and the bootstrap uses the same random streams, so the
+# tables are the same whichever script computed them.
+# The diagrams are plotted with the non-interactive Agg backend. Each process creates its three figures only once,
+# and clears and reuses them for every VRT and StepF (instead of opening three new figures each time), so the memory
+# used does not grow with the number of diagrams. The missing (or stale) tables and the (VRT, StepF) diagrams are 
+# computed in parallel by a pool of workers.
 
 # INPUT PARAMETERS DESCRIPTION
 # DateS (date, in format YYYYMMDD): start date of the considered verification period.
@@ -15,12 +33,18 @@ import matplotlib.pyplot as plt
 # StepF_Final (integer, in hours): last final step of the accumulation periods to consider.
 # Disc_Step (integer, in hours): discretization for the final steps to consider.
 # Acc (number, in hours): rainfall accumulation to consider.
+# RepetitionsBS (integer, from 0 to infinite): number of repetitions to consider in the bootstrapping.
+# SeedBS (integer, from 0 to infinite): seed of the random streams of the bootstrapping (the same seed gives the same bootstrapped values).
+# BlockBS (integer, from 1 to infinite): number of bootstrap repetitions drawn from the same random stream.
+# CL_BS (integer from 0 to 100, in percent): confidence level of the confidence intervals of the observation relative frequency.
 # VRT_list (list of floats, from 0 to infinite, in mm): list of verifing rainfall events (VRT).
 # SystemFC_list (list of strings): list of names of forecasting systems to consider.
 # Colour_SystemFC_list (list of strings): colours used to plot the BSrel values for different forecasting systems.
 # Git_repo (string): repository's local path.
-# DirIN (string): relative path containing the counts of EM and OBS exceeding a certain VRT.
+# DirIN (string): relative path containing the stores of the counts of EM and OBS exceeding a certain VRT, and of their daily histograms.
+# DirIN_Reliability (string): relative path containing the reliability and sharpness tables.
 # DirOUT (string): relative path of the directory containing the reliability and sharpness diagrams.
+# NumWorkers (integer, from 1 to infinite): number of worker processes (by default, the number of cores available to the job).
 
 # INPUT PARAMETERS
 DateS = datetime(2021, 12, 1, 0)
@@ -29,132 +53,206 @@ StepF_Start = 12
 StepF_Final = 246
 Disc_Step = 6
 Acc = 12
+RepetitionsBS = 1000
+SeedBS = 20211201
+BlockBS = 100
+CL_BS = 99
 VRT_list = [0.2, 10, 50]
 SystemFC_list = ["ENS", "ecPoint_MultipleWT", "ecPoint_SingleWT"]
 Colour_SystemFC_list = ["darkcyan", "orangered", "dimgray"]
 Git_repo = "/ec/vol/ecpoint_dev/mofp/Papers_2_Write/Verif_ecPoint_SingleWT"
 DirIN = "Data/Compute/01_Count_EM_OBS_Exceeding_VRT"
+DirIN_Reliability = "Data/Compute/12_Reliability_Sharpness_Tables_BS"
 DirOUT = "Data/Plot/04_Reliability_Sharpness_Diagrams_NoBS"
+NumWorkers = len(os.sched_getaffinity(0))
 #########################################################################################
 
-# Create the probability bins for the diagrams
-disc = 0.01
-prob_ThrL_list = np.arange(0 - disc/2, 1, disc)
-prob_ThrH_list = np.arange(0 + disc/2, 1 + disc, disc)
-
-# Computing the reliability and sharpness diagrams for a specific VRT
-for VRT in VRT_list:
-
-      # Computing the reliability and sharpness diagrams for a specific StepF
-      for StepF in range(StepF_Start, (StepF_Final+1), Disc_Step):
-            
-            print("Creating reliability and sharpness diagrams for VRT>=" + str(VRT) + ", StepF=" + str(StepF))
-
-            # Initialize figures that will plot the reliability and the sharpness diagrams
-            fig1, ax1 = plt.subplots(figsize=(10, 10)) # reliability diagram
-            fig2, ax2 = plt.subplots(figsize=(10, 10)) # zoomed reliability diagram
-            fig3, ax3 = plt.subplots(figsize=(10, 10)) # sharpness diagram
-
-            # Computing the reliability and sharpness diagrams for a specific forecasting system
-            for ind_SystemFC in range(len(SystemFC_list)):
-                  
-                  SystemFC = SystemFC_list[ind_SystemFC]
-                  Colour_SystemFC = Colour_SystemFC_list[ind_SystemFC]
-
-                  if SystemFC == "ENS":
-                        NumEM = 51
-                  else:
-                        NumEM = 99
-
-                  # Reading the daily counts of ensemble members and observations exceeding the considered verifying rainfall threshold.
-                  Count_EM_original = [] # initializing the variable that will contain the counts of ensemble members exceeding the VRT for the original dates
-                  Count_OBS_original = [] # initializing the variable that will contain the counts of observations exceeding the VRT for the original dates
-                  TheDate = DateS
-                  while TheDate <= DateF:
-                        DirIN_temp = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/" + str(VRT) + "/" + TheDate.strftime("%Y%m%d%H")
-                        FileNameIN_temp = "Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + "_" + TheDate.strftime("%Y%m%d") + "_" + TheDate.strftime("%H") + "_" + f"{StepF:03d}" + ".npy"
-                        if os.path.isfile(DirIN_temp + "/" + FileNameIN_temp): # proceed if the files exists
-                              Count_EM_OBS = np.load(DirIN_temp + "/" + FileNameIN_temp)
-                              Count_EM_original.extend(Count_EM_OBS[0].tolist())
-                              Count_OBS_original.extend(Count_EM_OBS[1].tolist())
-                        TheDate += timedelta(days=1)
-                  Count_EM_original = np.array(Count_EM_original, dtype=object)
-                  Count_OBS_original = np.array(Count_OBS_original, dtype=object)
-
-                  # Calculating the forecast probabilities
-                  Prob_EM = Count_EM_original / NumEM
-
-                  # Defining the forecasts and observation absolute/relative frequencies
-                  abs_freq_fc = []
-                  rel_freq_fc = []
-                  rel_freq_obs = []
-                  for ind_prob in range(len(prob_ThrL_list)):
-                        
-                        prob_ThrL = prob_ThrL_list[ind_prob]
-                        prob_ThrH = prob_ThrH_list[ind_prob]
-
-                        if ind_prob < NumEM:
-                              ind_prob_em_obs = np.where((Prob_EM >= prob_ThrL) & (Prob_EM < prob_ThrH))[0]
-                        else:
-                              ind_prob_em_obs = np.where((Prob_EM >= prob_ThrL) & (Prob_EM <= prob_ThrH))[0]
-                  
-                        if len(ind_prob_em_obs) > 0: # to avoid dividing by zero
-                              rel_freq_fc. append((prob_ThrL + prob_ThrH) / 2)
-                              rel_freq_obs.append(np.sum(Count_OBS_original[ind_prob_em_obs]) / len(Prob_EM[ind_prob_em_obs]))
-                              abs_freq_fc.append(len(Count_EM_original[ind_prob_em_obs]))
-
-                  # Plotting the reliability and sharpness diagrams
-                  ax1.plot(rel_freq_fc, rel_freq_obs, "-", color=Colour_SystemFC, label=SystemFC, linewidth=4)
-                  ax2.plot(rel_freq_fc, rel_freq_obs, "-", color=Colour_SystemFC, label=SystemFC, linewidth=2)
-                  ax3.plot(rel_freq_fc, abs_freq_fc, "-", color=Colour_SystemFC, label=SystemFC, linewidth=2)
-            
-            # Set the reliability diagram
-            ax1.plot([0,1], [0,1], "-", color="black", linewidth=3)
-            ax1.set_title("Reliability diagram\n VRT>=" + str(VRT) + "mm/" + str(Acc) + "h, StepF=" + str(StepF) + "\n ", fontsize=18, pad=20, weight="bold")
-            ax1.set_xlabel("Forecast probabilities", fontsize=16, labelpad=10)
-            ax1.set_ylabel("Observation relative frequency", fontsize=16, labelpad=10)
-            ax1.set_xlim([0,1])
-            ax1.set_ylim([0,1])
-            ax1.set_xticks(np.arange(0, 1.1, 0.5))
-            ax1.set_yticks(np.arange(0, 1.1, 0.5))
-            ax1.xaxis.set_tick_params(labelsize=24)
-            ax1.yaxis.set_tick_params(labelsize=24)
-            ax1.legend(loc="upper center", bbox_to_anchor=(0.5, 1.07), ncol=3, fontsize=16, frameon=False)
-
-            # Set the zoomed reliability diagram
-            ax2.plot([0,1], [0,1], "-", color="black", linewidth=3)
-            ax2.set_title("Reliability diagram\n VRT>=" + str(VRT) + "mm/" + str(Acc) + "h, StepF=" + str(StepF) + "\n ", fontsize=18, pad=20, weight="bold")
-            ax2.set_xlabel("Forecast probabilities", fontsize=16, labelpad=10)
-            ax2.set_ylabel("Observation relative frequency", fontsize=16, labelpad=10)
-            ax2.set_xlim([0,0.1])
-            ax2.set_ylim([0,0.1])
-            ax2.set_xticks(np.arange(0, 0.11, 0.01))
-            ax2.set_yticks(np.arange(0, 0.11, 0.01))
-            ax2.xaxis.set_tick_params(labelsize=16)
-            ax2.yaxis.set_tick_params(labelsize=16)
-            ax2.legend(loc="upper center", bbox_to_anchor=(0.5, 1.07), ncol=3, fontsize=16, frameon=False)
-            ax2.grid()
-
-            # Set the sharpness diagram
-            ax3.set_yscale('log')
-            ax3.set_title("Sharpness diagram\n VRT>=" + str(VRT) + "mm/" + str(Acc) + "h, StepF=" + str(StepF) + "\n ", fontsize=18, pad=20, weight="bold")
-            ax3.set_xlabel("Forecast probabilities", fontsize=16, labelpad=10)
-            ax3.set_ylabel("Forecast absolute frequency", fontsize=16, labelpad=10)
-            ax3.set_xlim([0,1])
-            ax3.set_ylim([0,10000000])
-            ax3.set_xticks(np.arange(0, 1.1, 0.1))
-            ax3.xaxis.set_tick_params(labelsize=16)
-            ax3.yaxis.set_tick_params(labelsize=16)
-            ax3.legend(loc="upper center", bbox_to_anchor=(0.5, 1.07), ncol=3, fontsize=16, frameon=False)
-            ax3.grid()
-
-            # Saving the reliability and sharpness diagrams
-            DirOUT_temp= Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/" + str(VRT) 
+
+# COSTUME FUNCTIONS
+
+#####################################
+# Recycled figures and tables #
+#####################################
+
+# Note: the figures and the tables are created (or read) once per process, and reused for all the diagrams plotted by the process.
+Figure_dict = {} # figures and axes, with their names as keys
+Table_dict = {} # reliability and sharpness tables, with the forecasting system and VRT as keys
+
+def get_figure(Name):
+      if Name not in Figure_dict:
+            Figure_dict[Name] = plt.subplots(figsize=(10, 10))
+      else:
+            Figure_dict[Name][1].cla()
+      return Figure_dict[Name]
+
+def file_table(SystemFC, VRT):
+      return Git_repo + "/" + DirIN_Reliability + "/" + f"{Acc:02d}" + "h/Reliability_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + ".npz"
+
+def get_table(SystemFC, VRT):
+      if (SystemFC, VRT) not in Table_dict:
+            Table_dict[(SystemFC, VRT)] = vf.load_reliability_tables(file_table(SystemFC, VRT))[0]
+      return Table_dict[(SystemFC, VRT)]
+
+#############################################################
+# Computation of the reliability and sharpness tables for one forecasting system and VRT #
+#############################################################
+
+# Note: the tables have the same layout as in 12_Compute_BSrel_AROCt_AROCz_HR_FAR_Reliability_BS.py and, as in 12, only
+# the daily joint histograms saved in the store of the VRT are read (for the dates for which the counts exist).
+def compute_table_task(SystemFC, VRT):
+
+      print("Computing the reliability and sharpness tables for " + SystemFC + ", VRT>=" + str(VRT))
+
+      # Defining the n. of ensemble members for the forecasting system
+      if SystemFC == "ENS":
+            NumEM = 51
+      else:
+            NumEM = 99
+
+      # Opening the store with the counts of ensemble members and observations exceeding the VRT
+      FileStore = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+      Store = vf.open_store(FileStore)
+
+      # Computing the tables for a specific lead time
+      Reliability_array = np.zeros([len(StepF_list), NumEM+1, 6])
+      for ind_StepF in range(len(StepF_list)):
+
+            StepF = StepF_list[ind_StepF]
+
+            # Reading the daily histograms of the counts of ensemble members and observations exceeding the considered verifying rainfall threshold (not all steps might have one if the forecasts did not exist)
+            Hist_original = [vf.read_hist(Store, BaseDateTime, StepF) for BaseDateTime in BaseDateTime_list if (BaseDateTime, StepF) in Store["lookup"]]
+            Hist_original = np.array(Hist_original).reshape(-1, NumEM+1, 2)
+
+            # Computing the tables for the original values, and the confidence intervals from the bootstrapped ones
+            Multiplicity = vf.multiplicity_BS(Hist_original.shape[0], RepetitionsBS, SeedBS, (SystemFC, VRT, StepF), BlockBS)
+            Reliability_array[ind_StepF, :, 0] = StepF
+            Reliability_array[ind_StepF, :, 1:] = vf.reliability_table_BS(vf.hist_BS(Hist_original, Multiplicity), NumEM, CL_BS)
+
+      # Saving the tables, with the settings used to compute them
+      vf.save_reliability_tables(file_table(SystemFC, VRT), Reliability_array, Settings_Reliability)
+
+#############################################################
+# Plotting of the reliability and sharpness diagrams for one VRT and StepF #
+#############################################################
+
+def plot_task(VRT, StepF):
+
+      print("Creating reliability and sharpness diagrams for VRT>=" + str(VRT) + ", StepF=" + str(StepF))
+
+      # Clearing the figures that will plot the reliability and the sharpness diagrams
+      fig1, ax1 = get_figure("Reliability") # reliability diagram
+      fig2, ax2 = get_figure("Reliability_Zoom") # zoomed reliability diagram
+      fig3, ax3 = get_figure("Sharpness") # sharpness diagram
+
+      # Plotting the reliability and sharpness diagrams for a specific forecasting system
+      for ind_SystemFC in range(len(SystemFC_list)):
+
+            SystemFC = SystemFC_list[ind_SystemFC]
+            Colour_SystemFC = Colour_SystemFC_list[ind_SystemFC]
+
+            # Selecting the forecast probabilities forecast at least once for the considered StepF
+            Table = get_table(SystemFC, VRT)
+            Table = Table[Table[:, 0, 0] == StepF][0]
+            Table = Table[Table[:, 3] > 0]
+            rel_freq_fc = Table[:, 1]
+            rel_freq_obs = Table[:, 2]
+            abs_freq_fc = Table[:, 3]
+            CI_lower = Table[:, 4]
+            CI_upper = Table[:, 5]
+
+            # Plotting the reliability (with the confidence intervals) and sharpness diagrams
+            ax1.plot(rel_freq_fc, rel_freq_obs, "-", color=Colour_SystemFC, label=SystemFC, linewidth=4)
+            ax1.fill_between(rel_freq_fc, CI_lower, CI_upper, color=Colour_SystemFC, alpha=0.2, edgecolor="none")
+            ax2.plot(rel_freq_fc, rel_freq_obs, "-", color=Colour_SystemFC, label=SystemFC, linewidth=2)
+            ax2.fill_between(rel_freq_fc, CI_lower, CI_upper, color=Colour_SystemFC, alpha=0.2, edgecolor="none")
+            ax3.plot(rel_freq_fc, abs_freq_fc, "-", color=Colour_SystemFC, label=SystemFC, linewidth=2)
+
+      # Set the reliability diagram
+      ax1.plot([0,1], [0,1], "-", color="black", linewidth=3)
+      ax1.set_title("Reliability diagram\n VRT>=" + str(VRT) + "mm/" + str(Acc) + "h, StepF=" + str(StepF) + "\n ", fontsize=18, pad=20, weight="bold")
+      ax1.set_xlabel("Forecast probabilities", fontsize=16, labelpad=10)
+      ax1.set_ylabel("Observation relative frequency", fontsize=16, labelpad=10)
+      ax1.set_xlim([0,1])
+      ax1.set_ylim([0,1])
+      ax1.set_xticks(np.arange(0, 1.1, 0.5))
+      ax1.set_yticks(np.arange(0, 1.1, 0.5))
+      ax1.xaxis.set_tick_params(labelsize=24)
+      ax1.yaxis.set_tick_params(labelsize=24)
+      ax1.legend(loc="upper center", bbox_to_anchor=(0.5, 1.07), ncol=3, fontsize=16, frameon=False)
+
+      # Set the zoomed reliability diagram
+      ax2.plot([0,1], [0,1], "-", color="black", linewidth=3)
+      ax2.set_title("Reliability diagram\n VRT>=" + str(VRT) + "mm/" + str(Acc) + "h, StepF=" + str(StepF) + "\n ", fontsize=18, pad=20, weight="bold")
+      ax2.set_xlabel("Forecast probabilities", fontsize=16, labelpad=10)
+      ax2.set_ylabel("Observation relative frequency", fontsize=16, labelpad=10)
+      ax2.set_xlim([0,0.1])
+      ax2.set_ylim([0,0.1])
+      ax2.set_xticks(np.arange(0, 0.11, 0.01))
+      ax2.set_yticks(np.arange(0, 0.11, 0.01))
+      ax2.xaxis.set_tick_params(labelsize=16)
+      ax2.yaxis.set_tick_params(labelsize=16)
+      ax2.legend(loc="upper center", bbox_to_anchor=(0.5, 1.07), ncol=3, fontsize=16, frameon=False)
+      ax2.grid()
+
+      # Set the sharpness diagram
+      ax3.set_yscale('log')
+      ax3.set_title("Sharpness diagram\n VRT>=" + str(VRT) + "mm/" + str(Acc) + "h, StepF=" + str(StepF) + "\n ", fontsize=18, pad=20, weight="bold")
+      ax3.set_xlabel("Forecast probabilities", fontsize=16, labelpad=10)
+      ax3.set_ylabel("Forecast absolute frequency", fontsize=16, labelpad=10)
+      ax3.set_xlim([0,1])
+      ax3.set_ylim([0,10000000])
+      ax3.set_xticks(np.arange(0, 1.1, 0.1))
+      ax3.xaxis.set_tick_params(labelsize=16)
+      ax3.yaxis.set_tick_params(labelsize=16)
+      ax3.legend(loc="upper center", bbox_to_anchor=(0.5, 1.07), ncol=3, fontsize=16, frameon=False)
+      ax3.grid()
+
+      # Saving the reliability and sharpness diagrams
+      DirOUT_temp= Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/" + str(VRT)
+      FileNameOUT_Reliability = "Reliability_" + f"{Acc:02d}" + "h_" + str(VRT) + "_" + f"{StepF:02d}" + ".jpeg"
+      FileNameOUT_Reliability_Zoom = "Reliability_Zoom_" + f"{Acc:02d}" + "h_" + str(VRT) + "_" + f"{StepF:02d}" + ".jpeg"
+      FileNameOUT_Sharpness = "Sharpness_" + f"{Acc:02d}" + "h_" + str(VRT) + "_" + f"{StepF:02d}" + ".jpeg"
+      fig1.savefig(DirOUT_temp + "/" + FileNameOUT_Reliability)
+      fig2.savefig(DirOUT_temp + "/" + FileNameOUT_Reliability_Zoom)
+      fig3.savefig(DirOUT_temp + "/" + FileNameOUT_Sharpness)
+
+#########################################################################################
+
+
+# Defining the list of StepF to consider
+StepF_list = range(StepF_Start, (StepF_Final+1), Disc_Step)
+
+# Defining the settings of the reliability and sharpness tables (the tables saved with different settings are recomputed)
+Settings_Reliability = vf.settings_reliability_tables(DateS, DateF, StepF_list, RepetitionsBS, SeedBS, BlockBS, CL_BS)
+
+# Defining the list of base dates to consider (each VRT then keeps the ones in its own store)
+BaseDateTime_list = []
+TheDate = DateS
+while TheDate <= DateF:
+      BaseDateTime_list.append(int(TheDate.strftime("%Y%m%d%H")))
+      TheDate += timedelta(days=1)
+
+if __name__ == "__main__":
+
+      # Setting the output directories
+      for DirOUT_temp in [Git_repo + "/" + DirIN_Reliability + "/" + f"{Acc:02d}" + "h"] + [Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/" + str(VRT) for VRT in VRT_list]:
             if not os.path.exists(DirOUT_temp):
                   os.makedirs(DirOUT_temp)
-            FileNameOUT_Reliability = "Reliability_" + f"{Acc:02d}" + "h_" + str(VRT) + "_" + f"{StepF:02d}" + ".jpeg"
-            FileNameOUT_Reliability_Zoom = "Reliability_Zoom_" + f"{Acc:02d}" + "h_" + str(VRT) + "_" + f"{StepF:02d}" + ".jpeg"
-            FileNameOUT_Sharpness = "Sharpness_" + f"{Acc:02d}" + "h_" + str(VRT) + "_" + f"{StepF:02d}" + ".jpeg"
-            fig1.savefig(DirOUT_temp + "/" + FileNameOUT_Reliability)
-            fig2.savefig(DirOUT_temp + "/" + FileNameOUT_Reliability_Zoom)
-            fig3.savefig(DirOUT_temp + "/" + FileNameOUT_Sharpness)
+
+      # Defining the tasks for the tables that do not exist (or were computed with different settings), and for a specific VRT and StepF
+      Task_Table_list = [(SystemFC, VRT) for SystemFC in SystemFC_list for VRT in VRT_list if not vf.match_reliability_tables(file_table(SystemFC, VRT), Settings_Reliability)]
+      Task_Plot_list = [(VRT, StepF) for VRT in VRT_list for StepF in StepF_list]
+
+      # Computing the tables that do not exist (or were computed with different settings), and plotting the reliability and sharpness diagrams
+      print("Creating reliability and sharpness diagrams (" + str(len(Task_Table_list)) + " tables to compute, " + str(len(Task_Plot_list)) + " diagrams, on " + str(NumWorkers) + " workers)")
+      if NumWorkers > 1:
+            with ProcessPoolExecutor(max_workers=NumWorkers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                  for Future in [executor.submit(compute_table_task, *Task) for Task in Task_Table_list]:
+                        Future.result()
+                  for Future in [executor.submit(plot_task, *Task) for Task in Task_Plot_list]:
+                        Future.result()
+      else:
+            for Task in Task_Table_list:
+                  compute_table_task(*Task)
+            for Task in Task_Plot_list:
+                  plot_task(*Task)
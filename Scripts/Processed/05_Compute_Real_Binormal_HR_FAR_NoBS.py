@@ -1,12 +1,17 @@
-import os as os
 from datetime import datetime, timedelta
 import numpy as np
-from scipy.stats import norm
+import Verif_Functions as vf
 
 ##########################################################################################################
 # CODE DESCRIPTION
 # 05_Compute_Real_Binormal_HR_FAR.py computes real and binormal hit rates (HRs) and false alarm rates (FARs). 
-# Code runtime: the code take up to 8 hours to run in serial.
+# Code runtime: the code takes a few minutes to run in serial.
+# Note: the HRs and FARs are computed from the sum of the daily joint histograms of the counts of ensemble members and
+# observations exceeding the VRT (see "real_HR_FAR" and "binormal_HR_FAR" in Verif_Functions.py), with the same 
+# functions as in 12_Compute_BSrel_AROCt_AROCz_HR_FAR_Reliability_BS.py, so the two scripts save the same values.
+# Note: the HRs and FARs of all the StepFs for a forecasting system and VRT are saved in a single ".npz" file (see 
+# "save_ROC_curves" in Verif_Functions.py), as arrays of StepFs x points allocated by "new_ROC_curves" 
+# (NumEM+3 points for the "real" curves, a point for each z in "Z_Binormal" for the "binormal" ones), as in 12.
 
 # INPUT PARAMETERS DESCRIPTION
 # DateS (date, in format YYYYMMDD): start date of the considered verification period.
@@ -18,8 +23,8 @@ from scipy.stats import norm
 # VRT_list (list of floats, from 0 to infinite, in mm): list of verifing rainfall events (VRT).
 # SystemFC_list (list of strings): list of names of forecasting systems to consider.
 # Git_repo (string): repository's local path.
-# DirIN (string): relative path of the input directory containing the counts of FC memebers and OBS exceeding the considered VRT.
-# DirOUT (string): relative path of the output directory containing the real and binormal HRs, FARs, and AROCs.
+# DirIN (string): relative path of the input directory containing the stores of the counts of FC memebers and OBS exceeding the considered VRT.
+# DirOUT (string): relative path of the output directory containing the real and binormal HRs and FARs.
 
 # INPUT PARAMETERS
 DateS = datetime(2021, 12, 1, 0)
@@ -36,65 +41,9 @@ DirOUT = "Data/Compute/05_Real_Binormal_HR_FAR_NoBS"
 ##########################################################################################################
 
 
-# COSTUME PYTHON FUNCTIONS
-
-#######################################################
-# Computation of 'real' Hit Rates (HR) and False Alarm Rates (FAR) #
-#######################################################
-
-def real_HR_FAR(count_em, count_obs, NumEM):
-
-      # Computing the probabilistic contingency table
-      ct = np.empty([NumEM+1, 4])
-      for index in range(NumEM+1):
-            count_members = NumEM - index
-            OBS_yes_fc = count_obs[np.where(count_em >= count_members)[0]] # observation instances for "yes" forecasts
-            OBS_no_fc = count_obs[np.where(count_em < count_members)[0]] # observation instances for "no" forecasts
-            ct[index][0] = np.where(OBS_yes_fc > 0)[0].shape[0]  # hits
-            ct[index][1] = np.where(OBS_yes_fc == 0)[0].shape[0]  # false alarms
-            ct[index][2] = np.where(OBS_no_fc > 0)[0].shape[0]  # misses
-            ct[index][3] = np.where(OBS_no_fc == 0)[0].shape[0]  # correct negatives
-      ct = ct.astype(int)  # setting all values as integers
-
-      # Computing hit rates (hr) and false alarm rates (far).
-      hr = ct[:, 0] / (ct[:, 0] + ct[:, 2])  # hit rates
-      far = ct[:, 1] / (ct[:, 1] + ct[:, 3])  # false alarms
-
-      # Adding the points (0,0) and (1,1) to the arrays to ensure the ROC curve is closed.
-      hr = np.insert(hr, 0, 0)
-      hr = np.insert(hr, -1, 1)
-      far = np.insert(far, 0, 0)
-      far = np.insert(far, -1, 1)
-
-      return hr, far
-        
-#######################################################################
-# Computation of hit rates (HRz) and false alarm rates (FARz) with the binormal model #
-#######################################################################
-
-def binormal_HR_FAR(hr, far):
-    
-      # Compute the inverse of the HRs and FARs with the binormal approximation
-      HRz_inv = norm.ppf(hr) # z-score for HR
-      FARz_inv = norm.ppf(far) # z-score for FAR
-      ind_finite = np.where(np.isfinite(FARz_inv + HRz_inv)) # index only finite values
-      HRz_inv = HRz_inv[ind_finite[0]]
-      FARz_inv = FARz_inv[ind_finite[0]]
-
-      # Apply linear regression (1) to define the parameters of the binormal model.
-      binormal_params = np.polyfit(FARz_inv,HRz_inv,1) 
-      
-      # Compute the HRs and FARs with the binormal approximation
-      x = np.arange(-10,10,0.1) # sample the z-space
-      predict = np.poly1d(binormal_params)
-      y = predict(x)
-      HRz = norm.cdf(y)
-      FARz = norm.cdf(x)
-    
-      return HRz, FARz
-
-##################################################################################################
-
+# Defining the list of StepF to consider
+StepF_list = range(StepF_Start, (StepF_Final+1), Disc_Step)
+m = len(StepF_list)
 
 # Computing the "real" and "binormal" HRs and FAR for a specific forecasting system
 for SystemFC in SystemFC_list:
@@ -108,43 +57,33 @@ for SystemFC in SystemFC_list:
       # Computing the "real" and "binormal" HRs and FARs for a specific VRT
       for VRT in VRT_list:
 
+            # Opening the store with the counts of ensemble members and observations exceeding the VRT, and their daily histograms
+            FileStore = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+            Store = vf.open_store(FileStore)
+
+            # Initializing the variables containing the "real" and "binormal" HRs and FARs for all lead times
+            HR_array, FAR_array, HRz_array, FARz_array = vf.new_ROC_curves(m, NumEM)
+
             # Computing the "real" and "binormal" HRs and FARs for a specific lead time
-            for StepF in range(StepF_Start, (StepF_Final+1), Disc_Step):
+            for ind_StepF in range(m):
 
-                  print(" - Computing and saving the 'real' and 'binormal' HRs and FARs for " + SystemFC +", VRT>=" + str(VRT) + ", StepF=" + str(StepF))
+                  StepF = StepF_list[ind_StepF]
+                  print(" - Computing the 'real' and 'binormal' HRs and FARs for " + SystemFC +", VRT>=" + str(VRT) + ", StepF=" + str(StepF))
 
-                  # Reading the daily counts of ensemble members and observations exceeding the considered verifying rainfall threshold.
-                  Count_EM_original = [] # initializing the variable that will contain the counts of ensemble members exceeding the VRT for the original dates
-                  Count_OBS_original = [] # initializing the variable that will contain the counts of observations exceeding the VRT for the original dates
+                  # Summing the daily histograms of the counts of ensemble members and observations exceeding the considered verifying rainfall threshold (not all steps might have one if the forecasts did not exist)
+                  Hist = np.zeros([NumEM+1, 2], dtype=np.int64)
                   TheDate = DateS
                   while TheDate <= DateF:
-                        DirIN_temp = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/" + str(VRT) + "/" + TheDate.strftime("%Y%m%d%H")
-                        FileNameIN_temp = "Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + "_" + TheDate.strftime("%Y%m%d") + "_" + TheDate.strftime("%H") + "_" + f"{StepF:03d}" + ".npy"
-                        if os.path.isfile(DirIN_temp + "/" + FileNameIN_temp): # proceed if the files exists
-                              Count_EM_OBS = np.load(DirIN_temp + "/" + FileNameIN_temp)
-                              Count_EM_original.extend(Count_EM_OBS[0].tolist())
-                              Count_OBS_original.extend(Count_EM_OBS[1].tolist())
+                        BaseDateTime = int(TheDate.strftime("%Y%m%d%H"))
+                        if (BaseDateTime, StepF) in Store["lookup"]: # proceed if the record exists
+                              Hist += vf.read_hist(Store, BaseDateTime, StepF)
                         TheDate += timedelta(days=1)
-                  Count_EM_original = np.array(Count_EM_original, dtype=object)
-                  Count_OBS_original = np.array(Count_OBS_original, dtype=object)
 
-                  # Computing the "real" HRs and FARs
-                  HR, FAR = real_HR_FAR(Count_EM_original, Count_OBS_original, NumEM)
-                  
-                  # Computing the "binormal" HRs and FARs
-                  HRz, FARz = binormal_HR_FAR(HR,FAR)
+                  # Computing the "real" and "binormal" HRs and FARs
+                  HR_array[ind_StepF], FAR_array[ind_StepF] = vf.real_HR_FAR(Hist)
+                  HRz_array[ind_StepF], FARz_array[ind_StepF] = vf.binormal_HR_FAR(HR_array[ind_StepF], FAR_array[ind_StepF])
 
-                  # Saving the "real" and "binormal" HRs and FARs, and the variables that determine the good of fitness of binormal model for fitting the "real" ROC curve
-                  MainDirOUT = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h" + "/" + SystemFC +  "/" + str(VRT)
-                  if not os.path.exists(MainDirOUT):
-                        os.makedirs(MainDirOUT)
-                  
-                  FileNameOUT_temp = "HR_" + f"{Acc:02d}" + "h_" + SystemFC +  "_" + str(VRT) + "_" + f"{StepF:03d}"
-                  np.save(MainDirOUT + "/" +  FileNameOUT_temp, HR) 
-                  FileNameOUT_temp = "FAR_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + "_" + f"{StepF:03d}"
-                  np.save(MainDirOUT + "/" +  FileNameOUT_temp, FAR)
-                  
-                  FileNameOUT_temp = "HRz_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + "_" + f"{StepF:03d}"
-                  np.save(MainDirOUT + "/" +  FileNameOUT_temp, HRz) 
-                  FileNameOUT_temp = "FARz_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + "_" + f"{StepF:03d}"
-                  np.save(MainDirOUT + "/" +  FileNameOUT_temp, FARz)                 
\ No newline at end of file
+            # Saving the "real" and "binormal" HRs and FARs for all lead times
+            print(" - Saving the 'real' and 'binormal' HRs and FARs for " + SystemFC +", VRT>=" + str(VRT))
+            FileOUT = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/HR_FAR_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + ".npz"
+            vf.save_ROC_curves(FileOUT, StepF_list, HR_array, FAR_array, HRz_array, FARz_array)
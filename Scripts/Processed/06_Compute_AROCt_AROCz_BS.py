@@ -1,18 +1,29 @@
 import os
 import sys
+import multiprocessing
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from random import choices
-import itertools
 import numpy as np
-from scipy.stats import norm
+import Verif_Functions as vf
 
 ###############################################################################################
 # CODE DESCRIPTION
 # 06_Compute_AROCt_AROCz_BS.py computes the values of the Area Under the ROC curve with the trapezoidal 
 # approximation (AROCt) and the Area Under the ROC curve using the binormal fitting (AROCz), including 
 # bootstrapped (BS) values.
-# Code Runtime: the script can take up 18 days to run in serial. It is recommended to run the code in parallel for 
-# different forecasting systems and VRT values to bring down the runtime to 2 days.
+# Note: the contingency tables for all the probability thresholds and all the bootstrap replicates are computed 
+# from the daily joint histograms of the counts of ensemble members and observations exceeding the VRT. AROCt and 
+# AROCz are then computed for all the replicates at once.
+# The bootstrapped days are drawn from seeded random streams (one per forecasting system, VRT, StepF and block of 
+# repetitions), so the bootstrapped values are reproducible, also when the computations are split across processes.
+# If a tolerance is given, the bootstrap repetitions are drawn in blocks until the confidence intervals converge (up 
+# to RepetitionsBS repetitions, and not before MinRepsBS repetitions). The repetitions not drawn are NaN, and the 
+# number of repetitions drawn is saved.
+# The daily histograms of all the StepFs for a forecasting system and VRT are read once into shared memory, and the 
+# lead times and blocks of bootstrap repetitions are computed in parallel by a pool of workers, which read the 
+# histograms and write AROCt and AROCz in shared arrays (zero-copy). With a tolerance, the workers compute one lead 
+# time each (as the convergence of the confidence intervals is checked block after block).
 
 # INPUT PARAMETERS DESCRIPTION
 # DateS (date, in format YYYYMMDD): start date of the considered verification period.
@@ -22,11 +33,17 @@ from scipy.stats import norm
 # Disc_Step (integer, in hours): discretization for the final steps to consider.
 # Acc (number, in hours): rainfall accumulation to consider.
 # RepetitionsBS (integer, from 0 to infinite): number of repetitions to consider in the bootstrapping.
+# SeedBS (integer, from 0 to infinite): seed of the random streams of the bootstrapping (the same seed gives the same bootstrapped values).
+# BlockBS (integer, from 1 to infinite): number of bootstrap repetitions drawn from the same random stream.
+# CL_BS (integer from 0 to 100, in percent): confidence level of the confidence intervals (of AROCt and AROCz) whose convergence stops the bootstrapping.
+# Tol_BS (float, from 0 to infinite, or None): tolerance on the change of the bounds of the confidence intervals after a new block of repetitions, below which the bootstrapping stops (None to always draw RepetitionsBS repetitions).
+# MinRepsBS (integer, from 0 to RepetitionsBS-1): minimum number of repetitions drawn before the bootstrapping can stop with Tol_BS (at CL_BS=99, the 0.5th and 99.5th percentiles are poorly estimated from only one or two blocks of repetitions).
 # VRT_list (list of floats, from 0 to infinite, in mm): list of verifing rainfall thresholds (VRT).
 # SystemFC_list (list of strings): list of names of forecasting systems to consider.
 # Git_repo (string): repository's local path.
-# DirIN (string): relative path containing the counts of EM and OBS exceeding a certain VRT.
+# DirIN (string): relative path containing the stores of the counts of EM and OBS exceeding a certain VRT, and of their daily histograms.
 # DirOUT (string): relative path of the directory containing the AROC values, including the bootstrapped ones.
+# NumWorkers (integer, from 1 to infinite): number of worker processes (by default, the number of cores available to the job).
 
 # INPUT PARAMETERS
 DateS = datetime(2021, 12, 1, 0)
@@ -36,186 +53,200 @@ StepF_Final = 246
 Disc_Step = 6
 Acc = 12
 RepetitionsBS = 1000
+SeedBS = 20211201
+BlockBS = 100
+CL_BS = 99
+Tol_BS = None
+MinRepsBS = 300
 VRT_list = sys.argv[1]
 SystemFC_list = sys.argv[2]
 Git_repo = "/ec/vol/ecpoint_dev/mofp/Papers_2_Write/Verif_ecPoint_SingleWT"
 DirIN = "Data/Compute/01_Count_EM_OBS_Exceeding_VRT"
 DirOUT = "Data/Compute/06_AROCt_AROCz_BS"
+NumWorkers = len(os.sched_getaffinity(0))
 ###############################################################################################
 
 
 # COSTUME FUNCTIONS
 
-###########################################
-# "Trapezoidal" Area Under the ROC curve (AROCt) #
-###########################################
-
-# Note: the computation of AROC values uses the trapezoidal approximation
-def AROC_trapezoidal(count_em, count_obs, NumEM):
-
-      # Computing the probabilistic contingency table
-      ct = np.empty([NumEM+1, 4])
-      for index in range(NumEM+1):
-            count_members = NumEM - index
-            OBS_yes_fc = count_obs[np.where(count_em >= count_members)[0]] # observation instances for "yes" forecasts
-            OBS_no_fc = count_obs[np.where(count_em < count_members)[0]] # observation instances for "no" forecasts
-            ct[index][0] = np.where(OBS_yes_fc > 0)[0].shape[0]  # hits
-            ct[index][1] = np.where(OBS_yes_fc == 0)[0].shape[0]  # false alarms
-            ct[index][2] = np.where(OBS_no_fc > 0)[0].shape[0]  # misses
-            ct[index][3] = np.where(OBS_no_fc == 0)[0].shape[0]  # correct negatives
-      ct = ct.astype(int)  # setting all values as integers
-
-      # Computing hit rates (hr) and false alarm rates (far).
-      hr = ct[:, 0] / (ct[:, 0] + ct[:, 2])  # hit rates
-      far = ct[:, 1] / (ct[:, 1] + ct[:, 3])  # false alarms
-
-      # Adding the points (0,0) and (1,1) to the arrays to ensure the ROC curve is closed.
-      hr = np.insert(hr, 0, 0)
-      hr = np.insert(hr, -1, 1)
-      far = np.insert(far, 0, 0)
-      far = np.insert(far, -1, 1)
-
-      # Computing AROC with the trapezoidal approximation, and approximating its value to the second decimal digit.
-      AROCt = 0
-      for i in range(len(hr)-1):
-            j = i+1
-            a = hr[i]
-            b = hr[i+1]
-            h = far[i+1] - far[i]
-            AROCt = AROCt + (((a+b)*h) / 2)
-      AROCt = round(AROCt, 2)
-
-      return hr, far, AROCt
-
-
-##########################################
-# "Binormal" Area Under the ROC curve (AROCz)   #
-##########################################
-
-def binormal_AROC(hr,far):
-    
-      # Compute the inverse of the HRs and FARs with the binormal approximation
-      HRz_inv = norm.ppf(hr) # z-score for HR
-      FARz_inv = norm.ppf(far) # z-score for FAR
-      ind_finite = np.where(np.isfinite(FARz_inv + HRz_inv)) # index only finite values
-      HRz_inv = HRz_inv[ind_finite[0]]
-      FARz_inv = FARz_inv[ind_finite[0]]
-
-      # Apply linear regression (1) to define the parameters of the binormal model.
-      binormal_params = np.polyfit(FARz_inv,HRz_inv,1) 
-      
-      # Computing AROCz
-      AROCz = norm.cdf( (binormal_params[1]*( (binormal_params[0]**2+1.)/2.)**(-0.5) )/(2.**(0.5)))
-    
-      return AROCz 
-
-
-####################################################################################################
-
-
-print(" ")
-print("Computing AROCt and AROCz, including " + str(RepetitionsBS) + " bootstrapped values")
-
-# Reading the external input variables
-VRT_list_temp = []
-VRT_list = VRT_list.split(',')
-for elem in VRT_list:
-      if float(elem) < 1:
-            VRT_list_temp.append(float(elem))
+#####################################
+# Arrays in shared memory #
+#####################################
+
+# Note: the arrays are created in shared memory by the main process, and attached by name by the workers, which read 
+# and write them as zero-copy numpy views.
+Shared_Arrays = {} # numpy views of the shared arrays, with their names as keys
+Shared_Memory_list = [] # shared memory blocks created or attached by the process
+
+def create_shared(Name, Shape, DType):
+      shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(Shape)) * np.dtype(DType).itemsize))
+      Shared_Memory_list.append(shm)
+      Shared_Arrays[Name] = np.ndarray(Shape, dtype=DType, buffer=shm.buf)
+      Shared_Arrays[Name][...] = 0
+      return (shm.name, Shape, DType)
+
+def attach_shared(Shared_dict):
+      for Name, (Shm_Name, Shape, DType) in Shared_dict.items():
+            shm = shared_memory.SharedMemory(name=Shm_Name)
+            Shared_Memory_list.append(shm)
+            Shared_Arrays[Name] = np.ndarray(Shape, dtype=DType, buffer=shm.buf)
+
+def release_shared(Unlink):
+      Shared_Arrays.clear()
+      while len(Shared_Memory_list) > 0:
+            shm = Shared_Memory_list.pop()
+            shm.close()
+            if Unlink:
+                  shm.unlink()
+
+###########################################################
+# Computation of AROCt and AROCz for one lead time and block of repetitions #
+###########################################################
+
+# Note: ind_Block >= 0 computes the bootstrap repetitions of the block, ind_Block = -1 computes the original values, 
+# and ind_Block = None computes the original values and the bootstrap repetitions until the confidence intervals 
+# converge. The blocks use the same random streams as the serial computation, so the values do not depend on the 
+# number of workers.
+def compute_AROC_task(SystemFC, VRT, ind_StepF, ind_Block):
+
+      StepF = StepF_list[ind_StepF]
+      Hist_original = Shared_Arrays["Hist"][ind_StepF][Shared_Arrays["Exists"][ind_StepF]]
+      NumDays = Hist_original.shape[0]
+
+      if ind_Block is None:
+            AROCt_AROCz, Shared_Arrays["NumRepsBS"][ind_StepF, 1] = vf.adaptive_BS(Hist_original, vf.AROCt_AROCz, RepetitionsBS, SeedBS, (SystemFC, VRT, StepF), BlockBS, CL_BS, Tol_BS, MinRepsBS)
+            Shared_Arrays["AROCt"][ind_StepF, 1:] = AROCt_AROCz[0]
+            Shared_Arrays["AROCz"][ind_StepF, 1:] = AROCt_AROCz[1]
+      elif ind_Block < 0:
+            AROCt_AROCz = vf.AROCt_AROCz(vf.hist_BS(Hist_original, np.ones([1, NumDays])))
+            Shared_Arrays["AROCt"][ind_StepF, 1] = AROCt_AROCz[0, 0]
+            Shared_Arrays["AROCz"][ind_StepF, 1] = AROCt_AROCz[1, 0]
       else:
-            VRT_list_temp.append(int(elem))
-VRT_list = VRT_list_temp
-SystemFC_list  = SystemFC_list.split(',')
+            ind_S = ind_Block * BlockBS
+            ind_F = min(ind_S + BlockBS, RepetitionsBS)
+            Multiplicity = vf.multiplicity_BS_block(NumDays, SeedBS, (SystemFC, VRT, StepF), ind_Block, BlockBS)[:(ind_F - ind_S)]
+            AROCt_AROCz = vf.AROCt_AROCz(vf.hist_BS(Hist_original, Multiplicity))
+            Shared_Arrays["AROCt"][ind_StepF, (ind_S+2):(ind_F+2)] = AROCt_AROCz[0]
+            Shared_Arrays["AROCz"][ind_StepF, (ind_S+2):(ind_F+2)] = AROCt_AROCz[1]
+
+###############################################################################################
+
 
 # Creating the list containing the steps to considered in the computations
 StepF_list = range(StepF_Start, (StepF_Final+1), Disc_Step)
 m = len(StepF_list)
 
-# Computing AROCt and AROCz for a specific forecasting system
-for indSystemFC in range(len(SystemFC_list)):
-
-      # Selecting the forecasting system to consider and its number of ensemble members
-      SystemFC = SystemFC_list[indSystemFC]
-      
-      # Defining the n. of ensemble members for the forecasting system
-      if SystemFC == "ENS":
-            NumEM = 51
-      else:
-            NumEM = 99
-
-      # Computing AROCt and AROCz for a specific VRT
-      for VRT in VRT_list:
-
-            # Initializing the variable containing the AROCt and AROCz values, and the bootstrapped ones
-            AROCt_array = np.zeros([m, RepetitionsBS+2])
-            AROCz_array = np.zeros([m, RepetitionsBS+2])
-
-            # Computing AROCt and AROCz for a specific lead time
-            for indStepF in range(len(StepF_list)):
-
-                  # Selecting the StepF to consider
-                  StepF = StepF_list[indStepF]
-                  print(" - Computing AROCt and AROCz for " + SystemFC +", VRT>=" + str(VRT) + ", StepF=" + str(StepF))
-
-                  # Storing information about the step computed
-                  AROCt_array[indStepF, 0] = StepF
-                  AROCz_array[indStepF, 0] = StepF
-
-                  # Reading the daily counts of ensemble members and observations exceeding the considered verifying rainfall event.
-                  original_datesSTR_array = [] # list of dates for which the counts are created (not all steps might have one if the forecasts did not exist)
-                  Count_EM_original = [] # initializing the variable that will contain the counts of ensemble members exceeding the VRT for the original dates
-                  Count_OBS_original = [] # initializing the variable that will contain the counts of observations exceeding the VRT for the original dates
-                  TheDate = DateS
-                  while TheDate <= DateF:
-                        DirIN_temp = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/" + str(VRT) + "/" + TheDate.strftime("%Y%m%d%H")
-                        FileNameIN_temp = "Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + "_" + TheDate.strftime("%Y%m%d") + "_" + TheDate.strftime("%H") + "_" + f"{StepF:03d}" + ".npy"
-                        if os.path.isfile(DirIN_temp + "/" + FileNameIN_temp): # proceed if the files exists
-                              original_datesSTR_array.append(TheDate.strftime("%Y%m%d"))
-                              Count_EM_OBS = np.load(DirIN_temp + "/" + FileNameIN_temp)
-                              Count_EM_original.append(Count_EM_OBS[0].tolist())
-                              Count_OBS_original.append(Count_EM_OBS[1].tolist())
-                        TheDate += timedelta(days=1)
-                  Count_EM_original = np.array(Count_EM_original, dtype=object)
-                  Count_OBS_original = np.array(Count_OBS_original, dtype=object)
-
-                  # Computing AROCt and AROCz for the original and the bootstrapped values
-                  for ind_repBS in range(RepetitionsBS+1):
+if __name__ == "__main__":
+
+      print(" ")
+      print("Computing AROCt and AROCz, including " + str(RepetitionsBS) + " bootstrapped values")
+
+      # Reading the external input variables
+      VRT_list_temp = []
+      VRT_list = VRT_list.split(',')
+      for elem in VRT_list:
+            if float(elem) < 1:
+                  VRT_list_temp.append(float(elem))
+            else:
+                  VRT_list_temp.append(int(elem))
+      VRT_list = VRT_list_temp
+      SystemFC_list  = SystemFC_list.split(',')
+
+      # Checking that the bootstrapping can stop before RepetitionsBS repetitions when a tolerance is given
+      if Tol_BS is not None and MinRepsBS >= RepetitionsBS:
+            raise ValueError("MinRepsBS (" + str(MinRepsBS) + ") must be smaller than RepetitionsBS (" + str(RepetitionsBS) + ") when Tol_BS is given")
+
+      # Defining the list of base dates to consider
+      BaseDateTime_list = []
+      TheDate = DateS
+      while TheDate <= DateF:
+            BaseDateTime_list.append(int(TheDate.strftime("%Y%m%d%H")))
+            TheDate += timedelta(days=1)
+
+      # Computing AROCt and AROCz for a specific forecasting system
+      for indSystemFC in range(len(SystemFC_list)):
+
+            # Selecting the forecasting system to consider and its number of ensemble members
+            SystemFC = SystemFC_list[indSystemFC]
+            
+            # Defining the n. of ensemble members for the forecasting system
+            if SystemFC == "ENS":
+                  NumEM = 51
+            else:
+                  NumEM = 99
+
+            # Computing AROCt and AROCz for a specific VRT
+            for VRT in VRT_list:
+
+                  # Opening the store with the counts of ensemble members and observations exceeding the VRT, and their daily histograms
+                  FileStore = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+                  Store = vf.open_store(FileStore)
+
+                  # Initializing the shared arrays containing the daily histograms for all lead times and dates (and whether they exist, as not all steps might 
+                  # have one if the forecasts did not exist), and the AROCt and AROCz values, and the bootstrapped ones
+                  Shared_dict = {}
+                  Shared_dict["Hist"] = create_shared("Hist", (m, len(BaseDateTime_list), NumEM+1, 2), np.int64)
+                  Shared_dict["Exists"] = create_shared("Exists", (m, len(BaseDateTime_list)), np.bool_)
+                  Shared_dict["AROCt"] = create_shared("AROCt", (m, RepetitionsBS+2), np.float64)
+                  Shared_dict["AROCz"] = create_shared("AROCz", (m, RepetitionsBS+2), np.float64)
+                  Shared_dict["NumRepsBS"] = create_shared("NumRepsBS", (m, 2), np.float64) # StepF (column 0) and number of bootstrap repetitions drawn (column 1)
+
+                  try:
+
+                        # Reading once the daily histograms of the counts of ensemble members and observations exceeding the considered verifying rainfall event, for all lead times
+                        print(" - Reading the daily histograms for " + SystemFC +", VRT>=" + str(VRT))
+                        for ind_StepF in range(m):
+                              StepF = StepF_list[ind_StepF]
+                              Shared_Arrays["AROCt"][ind_StepF, 0] = StepF
+                              Shared_Arrays["AROCz"][ind_StepF, 0] = StepF
+                              Shared_Arrays["NumRepsBS"][ind_StepF, 0] = StepF
+                              Shared_Arrays["NumRepsBS"][ind_StepF, 1] = RepetitionsBS
+                              for ind_Date in range(len(BaseDateTime_list)):
+                                    if (BaseDateTime_list[ind_Date], StepF) in Store["lookup"]: # proceed if the record exists
+                                          Shared_Arrays["Hist"][ind_StepF, ind_Date] = vf.read_hist(Store, BaseDateTime_list[ind_Date], StepF)
+                                          Shared_Arrays["Exists"][ind_StepF, ind_Date] = True
+
+                        # Defining the tasks for a specific lead time and block of bootstrap repetitions
+                        if Tol_BS is None:
+                              Task_list = [(SystemFC, VRT, ind_StepF, ind_Block) for ind_StepF in range(m) for ind_Block in range(-1, (RepetitionsBS + BlockBS - 1) // BlockBS)]
+                        else:
+                              Task_list = [(SystemFC, VRT, ind_StepF, None) for ind_StepF in range(m)]
                         
-                        # Selecting whether to compute AROCt and AROCz for original or the bootstrapped values
-                        if ind_repBS == 0:  # original
-                              Count_EM = Count_EM_original
-                              Count_OBS = Count_OBS_original
-                        else:  # bootstrapped
-                              NumDays = len(original_datesSTR_array)
-                              datesBS_array = np.array(choices(population=original_datesSTR_array, k=NumDays)) # list of bootstrapped dates
-                              indBS = np.searchsorted(original_datesSTR_array, datesBS_array) # indexes of the bootstrapped dates
-                              Count_EM = Count_EM_original[indBS] # indexing the bootstrapped counts
-                              Count_OBS = Count_OBS_original[indBS] # indexing the bootstrapped counts
-
-                        # Expand the list of lists into a unique array
-                        Count_EM = np.array(list(itertools.chain.from_iterable(Count_EM.tolist())))
-                        Count_OBS = np.array(list(itertools.chain.from_iterable(Count_OBS.tolist())))
-
-                        # Computing AROCt
-                        HR, FAR, AROCt = AROC_trapezoidal(Count_EM, Count_OBS, NumEM)
-                        AROCt_array[indStepF, ind_repBS+1] = AROCt
-
-                        # Computing AROCz
-                        AROCz = binormal_AROC(HR, FAR)
-                        AROCz_array[indStepF, ind_repBS+1] = AROCz
-
-            # Saving AROCt
-            print("      - Saving AROCt for " + SystemFC + ", VRT>=" + str(VRT))
-            DirOUT_temp = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/AROCt/"
-            FileNameOUT_temp = "AROCt_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
-            if not os.path.exists(DirOUT_temp):
-                  os.makedirs(DirOUT_temp)
-            np.save(DirOUT_temp + "/" + FileNameOUT_temp, AROCt_array)
-
-            # Saving AROCz
-            print("      - Saving AROCz for " + SystemFC + ", VRT>=" + str(VRT))
-            DirOUT_temp = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/AROCz/"
-            FileNameOUT_temp = "AROCz_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
-            if not os.path.exists(DirOUT_temp):
-                  os.makedirs(DirOUT_temp)
-            np.save(DirOUT_temp + "/" + FileNameOUT_temp, AROCz_array)
\ No newline at end of file
+                        # Computing AROCt and AROCz for the original and the bootstrapped values
+                        print(" - Computing AROCt and AROCz for " + SystemFC +", VRT>=" + str(VRT) + " (" + str(len(Task_list)) + " tasks on " + str(NumWorkers) + " workers)")
+                        if NumWorkers > 1:
+                              with ProcessPoolExecutor(max_workers=NumWorkers, mp_context=multiprocessing.get_context("spawn"), initializer=attach_shared, initargs=(Shared_dict,)) as executor:
+                                    for Future in [executor.submit(compute_AROC_task, *Task) for Task in Task_list]:
+                                          Future.result()
+                        else:
+                              for Task in Task_list:
+                                    compute_AROC_task(*Task)
+                        AROCt_array = Shared_Arrays["AROCt"].copy()
+                        AROCz_array = Shared_Arrays["AROCz"].copy()
+                        NumRepsBS_array = Shared_Arrays["NumRepsBS"].copy()
+
+                  finally:
+                        release_shared(Unlink=True)
+
+                  # Saving AROCt
+                  print("      - Saving AROCt for " + SystemFC + ", VRT>=" + str(VRT))
+                  DirOUT_temp = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/AROCt/"
+                  FileNameOUT_temp = "AROCt_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+                  if not os.path.exists(DirOUT_temp):
+                        os.makedirs(DirOUT_temp)
+                  np.save(DirOUT_temp + "/" + FileNameOUT_temp, AROCt_array)
+
+                  # Saving AROCz
+                  print("      - Saving AROCz for " + SystemFC + ", VRT>=" + str(VRT))
+                  DirOUT_temp = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/AROCz/"
+                  FileNameOUT_temp = "AROCz_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+                  if not os.path.exists(DirOUT_temp):
+                        os.makedirs(DirOUT_temp)
+                  np.save(DirOUT_temp + "/" + FileNameOUT_temp, AROCz_array)
+
+                  # Saving the number of bootstrap repetitions drawn
+                  DirOUT_temp = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/NumRepsBS/"
+                  FileNameOUT_temp = "NumRepsBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+                  if not os.path.exists(DirOUT_temp):
+                        os.makedirs(DirOUT_temp)
+                  np.save(DirOUT_temp + "/" + FileNameOUT_temp, NumRepsBS_array)
\ No newline at end of file
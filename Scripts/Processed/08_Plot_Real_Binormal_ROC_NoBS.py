@@ -1,5 +1,10 @@
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+import Verif_Functions as vf
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
 ##############################################################################
@@ -7,6 +12,11 @@ import matplotlib.pyplot as plt
 # 06_Plot_Real_Binormal_ROC_NoBS.py plots "real" and "binormal" ROC curves with no 
 # confidence intervals.
 # Code runtime: the code takes 1 minute to run in serial.
+# Note: the "real" and "binormal" HRs and FARs of all the StepFs, and the AROCt and AROCz values, are read once per 
+# forecasting system and VRE (by each worker), and the values for a StepF are selected from them.
+# The ROC curves are plotted with the non-interactive Agg backend. Each process creates its figure only once, 
+# and clears and reuses it for every VRE and StepF. The (VRE, StepF) plots are computed in parallel by a pool of 
+# workers.
 
 # INPUT PARAMETERS DESCRIPTION
 # StepF_Start (integer, in hours): first final step of the accumulation periods to consider.
@@ -17,8 +27,10 @@ import matplotlib.pyplot as plt
 # SystemFC_list (list of strings): list of names of forecasting systems to consider.
 # Colour_SystemFC_list (list of strings): list of colours to assign to each forecasting system.
 # Git_repo (string): repository's local path.
-# DirIN (string): relative path of the input directoy containing the pre-computed HRs and FARs.
+# DirIN_HR_FAR (string): relative path of the input directoy containing the pre-computed HRs and FARs.
+# DirIN_AROC (string): relative path of the input directoy containing the pre-computed AROCt and AROCz values.
 # DirOUT (string): relative path of the directory containing the ROC curve plots.
+# NumWorkers (integer, from 1 to infinite): number of worker processes (by default, the number of cores available to the job).
 
 # INPUT PARAMETERS
 StepF_Start =12
@@ -30,74 +42,111 @@ SystemFC_list = ["ENS", "ecPoint_MultipleWT", "ecPoint_SingleWT"]
 Colour_SystemFC_list = ["darkcyan", "orangered", "dimgray"]
 Git_repo = "/ec/vol/ecpoint_dev/mofp/Papers_2_Write/Verif_ecPoint_SingleWT"
 DirIN_HR_FAR = "Data/Compute/05_Real_Binormal_HR_FAR_NoBS"
-DirIN_AROC = "Data/Compute/03_BSrel_AROCt_AROCz_BS"
+DirIN_AROC = "Data/Compute/06_AROCt_AROCz_BS"
 DirOUT = "Data/Plot/04_Real_Binormal_ROC_NoBS"
+NumWorkers = len(os.sched_getaffinity(0))
 ##############################################################################
 
 
-# Plotting the "real" and "binormal" ROC curves for a specific vre
-for vre in VRE_list:
+# COSTUME FUNCTIONS
 
-      # Setting the output directory
+#####################################
+# Recycled figures and curves #
+#####################################
+
+# Note: the figures and the curves are created (or read) once per process, and reused for all the plots of the process.
+Figure_dict = {} # figures and axes, with their names as keys
+Curves_dict = {} # "real" and "binormal" HRs, FARs and AROCs, with the forecasting system and VRE as keys
+
+def get_figure(Name):
+      if Name not in Figure_dict:
+            Figure_dict[Name] = plt.subplots(figsize=(10, 10))
+      else:
+            Figure_dict[Name][1].cla()
+      return Figure_dict[Name]
+
+def get_curves(SystemFC, vre):
+      if (SystemFC, vre) not in Curves_dict:
+            Curves_dict[(SystemFC, vre)] = vf.load_ROC_curves(Git_repo + "/" + DirIN_HR_FAR + "/" + f"{Acc:02d}" + "h/HR_FAR_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(vre) + ".npz")
+            Curves_dict[(SystemFC, vre)]["AROCt"] = np.load(Git_repo + "/" + DirIN_AROC + "/" + f"{Acc:02d}" + "h/AROCt/AROCt_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(vre) + ".npy")
+            Curves_dict[(SystemFC, vre)]["AROCz"] = np.load(Git_repo + "/" + DirIN_AROC + "/" + f"{Acc:02d}" + "h/AROCz/AROCz_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(vre) + ".npy")
+      return Curves_dict[(SystemFC, vre)]
+
+#########################################################
+# Plotting of the "real" and "binormal" ROC curves for one VRE and StepF #
+#########################################################
+
+def plot_task(vre, StepF):
+
+      print(" - Plotting the 'real' and 'binormal' ROC curves for VRE >= " + str(vre) + " mm/" + str(Acc) + "h and StepF = " + str(StepF))
+
+      # Clearing the figure that will plot the "real" and "binormal" ROC curves
+      fig, ax = get_figure("ROC")
+
+      # Plotting the "real" and "binormal" ROC curves for a specific forecasting system
+      for indSystemFC in range(len(SystemFC_list)):
+            
+            # Selecting the forecasting system to plot, and its correspondent colour in the plot
+            SystemFC = SystemFC_list[indSystemFC]
+            Colour_SystemFC = Colour_SystemFC_list[indSystemFC]
+
+            # Selecting the "real" and "binormal" AROC values, HRs and FARs for the step to plot
+            Curves = get_curves(SystemFC, vre)
+            AROCt = Curves["AROCt"]
+            AROCz = Curves["AROCz"]
+            ind_StepF = np.where(AROCt[:,0].astype(int) == StepF)[0][0]
+            ind_StepF_HR_FAR = np.where(Curves["StepF"] == StepF)[0][0]
+            HR = Curves["HR"][ind_StepF_HR_FAR]
+            FAR = Curves["FAR"][ind_StepF_HR_FAR]
+            HRz = Curves["HRz"][ind_StepF_HR_FAR]
+            FARz = Curves["FARz"][ind_StepF_HR_FAR]
+
+            # Plotting the "real" and "binormal" ROC curves
+            label_real = "ROC, " + SystemFC + " (AROCt = " + str(round(AROCt[ind_StepF,1],3)) + ")"
+            label_binormal = "ROCz, " + SystemFC + " (AROCz = " + str(round(AROCz[ind_StepF,1],3)) + ")"
+            ax.plot(FAR, HR, "o-", color=Colour_SystemFC, label=label_real, linewidth=3)
+            ax.plot(FARz, HRz, "--", color=Colour_SystemFC, label=label_binormal, linewidth=3)
+            
+      # Compliting the plot
+      ax.plot([0,1], [0,1], "-", color="black", linewidth=3)
+      ax.set_title("ROC curves, Real (ROC) and Binormal (ROCz)\n VRE >= " + str(vre) + "mm/" + str(Acc) + "h, StepF = " + str(StepF), fontsize = 24, pad=20, weight="bold")
+      ax.set_xlabel("False Alarm Rate, FAR [-]", fontsize = 24, labelpad=10)
+      ax.set_ylabel("Hit Rate, HR [-]", fontsize = 24, labelpad=10)
+      ax.set_xlim(0,1)
+      ax.set_xticks(np.arange(0,1.1, 0.1))
+      ax.xaxis.set_tick_params(labelsize=24)
+      ax.set_ylim(0,1)
+      ax.set_yticks(np.arange(0,1.1, 0.1))
+      ax.yaxis.set_tick_params(labelsize=24)
+      ax.legend(loc="lower right", fontsize=18)
+      ax.grid(True, color = "grey", linewidth = 0.5)
+
+      # Saving the "real" and "binormal" ROC curves
+      print(" - Saving the 'real' and 'binormal' ROC curves")
+      FileNameOUT_temp = "Real_Binormal_ROC_" + f"{Acc:02d}" + "h_" + str(vre) + "_" + f"{StepF:03d}" + ".jpeg"
       MainDirOUT = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/" + str(vre)
-      if not os.path.exists(MainDirOUT):
-            os.makedirs(MainDirOUT)
-
-      # Plotting the "real" and "binormal" ROC curves for a specific lead time
-      for StepF in range(StepF_Start, (StepF_Final+1), Disc_Step):
-
-            print(" - Plotting the 'real' and 'binormal' ROC curves for VRE >= " + str(vre) + " mm/" + str(Acc) + "h and StepF = " + str(StepF))
-
-            # Initialize figure that will plot the "real" and "binormal" ROC curves
-            fig, ax = plt.subplots(figsize=(10, 10))
-
-            # Plotting the "real" and "binormal" ROC curves for a specific forecasting system
-            for indSystemFC in range(len(SystemFC_list)):
-                  
-                  # Selecting the forecasting system to plot, and its correspondent colour in the plot
-                  SystemFC = SystemFC_list[indSystemFC]
-                  Colour_SystemFC = Colour_SystemFC_list[indSystemFC]
-
-                  # Reading the "real" and "binormal" AROC values
-                  FileIN_AROCt = Git_repo + "/" + DirIN_AROC + "/" + f"{Acc:02d}" + "h/AROCt/AROCt_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(vre) + ".npy"
-                  FileIN_AROCz = Git_repo + "/" + DirIN_AROC + "/" + f"{Acc:02d}" + "h/AROCz/AROCz_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(vre) + ".npy"
-                  AROCt = np.load(FileIN_AROCt)
-                  AROCz = np.load(FileIN_AROCz)
-                  
-                  # Indexing the step to plot for AROCt and AROCz
-                  StepF_list = AROCt[:,0].astype(int)
-                  ind_StepF = np.where(StepF_list == StepF)[0][0]
-
-                  # Reading the "real" and "binormal" HRs and FARs
-                  FileIN_HR = Git_repo + "/" + DirIN_HR_FAR + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/" + str(vre) + "/" + "HR_" +  f"{Acc:02d}" + "h_" + SystemFC + "_" + str(vre) + "_" + f"{StepF:03d}" + ".npy"
-                  FileIN_FAR = Git_repo + "/" + DirIN_HR_FAR + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/" + str(vre) + "/" + "FAR_" +  f"{Acc:02d}" + "h_" + SystemFC + "_" + str(vre) + "_" + f"{StepF:03d}" + ".npy"
-                  FileIN_HRz = Git_repo + "/" + DirIN_HR_FAR + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/" + str(vre) + "/" + "HRz_" +  f"{Acc:02d}" + "h_" + SystemFC + "_" + str(vre) + "_" + f"{StepF:03d}" + ".npy"
-                  FileIN_FARz = Git_repo + "/" + DirIN_HR_FAR + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/" + str(vre) + "/" + "FARz_" +  f"{Acc:02d}" + "h_" + SystemFC + "_" + str(vre) + "_" + f"{StepF:03d}" + ".npy"
-                  HR = np.load(FileIN_HR)
-                  FAR = np.load(FileIN_FAR)
-                  HRz = np.load(FileIN_HRz)
-                  FARz = np.load(FileIN_FARz)
-                  
-                  # Plotting the "real" and "binormal" ROC curves
-                  label_real = "ROC, " + SystemFC + " (AROCt = " + str(round(AROCt[ind_StepF,1],3)) + ")"
-                  label_binormal = "ROCz, " + SystemFC + " (AROCz = " + str(round(AROCz[ind_StepF,1],3)) + ")"
-                  plt.plot(FAR, HR, "o-", color=Colour_SystemFC, label=label_real, linewidth=3)
-                  plt.plot(FARz, HRz, "--", color=Colour_SystemFC, label=label_binormal, linewidth=3)
-                  
-            # Compliting the plot
-            plt.plot([0,1], [0,1], "-", color="black", linewidth=3)
-            plt.title("ROC curves, Real (ROC) and Binormal (ROCz)\n VRE >= " + str(vre) + "mm/" + str(Acc) + "h, StepF = " + str(StepF), fontsize = 24, pad=20, weight="bold")
-            plt.xlabel("False Alarm Rate, FAR [-]", fontsize = 24, labelpad=10)
-            plt.ylabel("Hit Rate, HR [-]", fontsize = 24, labelpad=10)
-            plt.xlim(0,1)
-            plt.xticks(np.arange(0,1.1, 0.1), fontsize = 24)
-            plt.ylim(0,1)
-            plt.yticks(np.arange(0,1.1, 0.1), fontsize = 24)
-            plt.legend(loc="lower right", fontsize=18)
-            plt.grid(True, color = "grey", linewidth = 0.5)
-
-            # Saving the "real" and "binormal" ROC curves
-            print(" - Saving the 'real' and 'binormal' ROC curves")
-            FileNameOUT_temp = "Real_Binormal_ROC_" + f"{Acc:02d}" + "h_" + str(vre) + "_" + f"{StepF:03d}" + ".jpeg"
-            plt.savefig(MainDirOUT + "/" + FileNameOUT_temp)
-            plt.close()
\ No newline at end of file
+      fig.savefig(MainDirOUT + "/" + FileNameOUT_temp)
+
+##############################################################################
+
+
+if __name__ == "__main__":
+
+      # Setting the output directories
+      for vre in VRE_list:
+            MainDirOUT = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/" + str(vre)
+            if not os.path.exists(MainDirOUT):
+                  os.makedirs(MainDirOUT)
+
+      # Defining the tasks for a specific vre and lead time
+      Task_list = [(vre, StepF) for vre in VRE_list for StepF in range(StepF_Start, (StepF_Final+1), Disc_Step)]
+
+      # Plotting the "real" and "binormal" ROC curves
+      print("Plotting the 'real' and 'binormal' ROC curves (" + str(len(Task_list)) + " tasks on " + str(NumWorkers) + " workers)")
+      if NumWorkers > 1:
+            with ProcessPoolExecutor(max_workers=NumWorkers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                  for Future in [executor.submit(plot_task, *Task) for Task in Task_list]:
+                        Future.result()
+      else:
+            for Task in Task_list:
+                  plot_task(*Task)
@@ -1,6 +1,8 @@
 import os
 from datetime import datetime, timedelta
+import numpy as np
 import metview as mv
+import Verif_Functions as vf
 
 ########################################################################################
 # CODE DESCRIPTION
@@ -13,6 +15,7 @@ import metview as mv
 # StartPeriod_list (list of integers): list of the accumulation period's starting time.
 # Git_repo (string): repository's local path.
 # DirIN (string): relative path containing the raw observations.
+# DirIN_OBS (string): relative path of the directory containing the inventory of the rainfall observations (the raw observations not in the inventory yet are added to it).
 # DirOUT (string): relative path of the directory containing the plots of rainfall gauge's locations.
 
 # INPUT PARAMETERS
@@ -21,21 +24,31 @@ Acc = 12
 StartPeriod_list = [0, 6, 12, 18]
 Git_repo = "/ec/vol/ecpoint_dev/mofp/Papers_2_Write/Verif_ecPoint_SingleWT"
 DirIN = "Data/Raw/OBS"
+DirIN_OBS = "Data/Compute/01_Count_EM_OBS_Exceeding_VRT/OBS_Inventory"
 DirOUT = "Data/Plot/09_RainOBS_Loc"
 ########################################################################################
 
 
+# Reading the inventory of the rainfall observations for the considered date
+FileStore_OBS = Git_repo + "/" + DirIN_OBS + "/OBS_" + f"{Acc:02d}" + "h"
+Store_OBS = vf.ingest_OBS_period(FileStore_OBS, Git_repo + "/" + DirIN, Acc, TheDate + timedelta(hours = (StartPeriod_list[0]+Acc)), TheDate + timedelta(hours = (StartPeriod_list[-1]+Acc)), StartPeriod_list[1] - StartPeriod_list[0])
+
 # Plotting the location of the rainfall observations for a specific accumulation period
-obs_all = None
+lats_all = []
+lons_all = []
+values_all = []
 for ind_StartPeriod in range(len(StartPeriod_list)):
 
       StartPeriod = StartPeriod_list[ind_StartPeriod]
       
       # Reading the rainfall observation for a specific date
       TheDateTime = TheDate + timedelta(hours = (StartPeriod+Acc))
-      obs = mv.read(Git_repo + "/" + DirIN + "/" + TheDateTime.strftime("%Y%m%d") + "/tp" + f"{Acc:02d}" + "_obs_" + TheDateTime.strftime("%Y%m%d%H") + ".geo")
-      obs_all = mv.merge(obs_all, obs)
-      print("N. obs for accumulatio period ending at " + str(StartPeriod) + " UTC: " + str(mv.count(obs)))
+      obs = vf.read_OBS(Store_OBS, int(TheDateTime.strftime("%Y%m%d%H")), Acc)
+      lats_all.append(obs["lat"])
+      lons_all.append(obs["lon"])
+      values_all.append(obs["value"])
+      print("N. obs for accumulatio period ending at " + str(StartPeriod) + " UTC: " + str(len(obs["value"])))
+obs_all = mv.create_geo(type = "xyv", latitudes = np.concatenate(lats_all), longitudes = np.concatenate(lons_all), values = np.concatenate(values_all))
 
 # Plotting the location of the observations
 coastlines = mv.mcoast(
@@ -0,0 +1,93 @@
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import Verif_Functions as vf
+
+########################################################################################
+# CODE DESCRIPTION
+# 11_Compute_BSrel_AROCt_AROCz_VRT_Sweep_NoBS.py computes the values of the Brier Score - Reliability component
+# (BSrel), and of the trapezoidal and binormal areas under the ROC curve (AROCt and AROCz), for a dense sweep of
+# verifying rainfall thresholds (VRT), without bootstrapping.
+# Note: the forecasts and observations at the stations are read from the cubes saved by
+# 01_Compute_Count_EM_OBS_Exceeding_VRT.py (with Save_Cube = True), so the raw forecasts are not read again. For
+# each forecasting system, StepF and date, the ensemble members are sorted once per station, and the joint
+# histograms for all the VRTs are computed at once with a binary search on the sorted members.
+# The values are saved in an array of VRTs x StepFs x 5, containing the VRT (column 0), the StepF (column 1),
+# BSrel (column 2), AROCt (column 3), and AROCz (column 4).
+
+# INPUT PARAMETERS DESCRIPTION
+# DateS (date, in format YYYYMMDD): start date of the considered verification period.
+# DateF (date, in format YYYYMMDD): final date of the considered verification period.
+# StepF_Start (integer, in hours): first final step of the accumulation periods to consider.
+# StepF_Final (integer, in hours): last final step of the accumulation periods to consider.
+# Disc_Step (integer, in hours): discretization for the final steps to consider.
+# Acc (number, in hours): rainfall accumulation to consider.
+# VRT_Sweep (list of floats, from 0 to infinite, in mm): list of verifing rainfall events (VRT) to sweep. The VRTs should not have more than two decimal digits (see "append_cube" in Verif_Functions.py).
+# SystemFC_list (list of strings): list of names of forecasting systems to consider.
+# Git_repo (string): repository's local path.
+# DirIN (string): relative path containing the cubes of the forecasts and observations at the stations.
+# DirOUT (string): relative path of the directory containing the BSrel, AROCt and AROCz values for the sweep of VRTs.
+
+# INPUT PARAMETERS
+DateS = datetime(2021, 12, 1, 0)
+DateF = datetime(2022, 11, 30, 0)
+StepF_Start = 12
+StepF_Final = 246
+Disc_Step = 6
+Acc = 12
+VRT_Sweep = np.unique(np.round(np.geomspace(0.2, 100, 50), 2))
+SystemFC_list = ["ENS", "ecPoint_SingleWT"]
+Git_repo = "/ec/vol/ecpoint_dev/mofp/Papers_2_Write/Verif_ecPoint_SingleWT"
+DirIN = "Data/Compute/01_Count_EM_OBS_Exceeding_VRT/Cube"
+DirOUT = "Data/Compute/11_BSrel_AROCt_AROCz_VRT_Sweep_NoBS"
+########################################################################################
+
+
+# Defining the list of StepF to consider
+StepF_list = range(StepF_Start, (StepF_Final+1), Disc_Step)
+m = len(StepF_list)
+
+# Computing the scores for a specific forecasting system
+for SystemFC in SystemFC_list:
+
+      # Opening the cube with the forecasts and observations at the stations
+      FileStore = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/Cube_" + f"{Acc:02d}" + "h_" + SystemFC
+      Store = vf.open_store(FileStore)
+
+      # Initializing the variable containing the scores for all the VRTs and StepFs
+      Scores_array = np.full([len(VRT_Sweep), m, 5], np.nan)
+      Scores_array[:, :, 0] = np.asarray(VRT_Sweep).reshape(-1, 1)
+      Scores_array[:, :, 1] = np.asarray(StepF_list).reshape(1, -1)
+
+      # Computing the scores for a specific lead time
+      for ind_StepF in range(m):
+
+            StepF = StepF_list[ind_StepF]
+            print("Computing BSrel, AROCt and AROCz for " + SystemFC + ", " + str(len(VRT_Sweep)) + " VRTs, StepF=" + str(StepF))
+
+            # Summing the daily joint histograms for all the VRTs
+            Hist = None
+            TheDate = DateS
+            while TheDate <= DateF:
+                  BaseDateTime = int(TheDate.strftime("%Y%m%d%H"))
+                  if (BaseDateTime, StepF) in Store["lookup"]: # proceed if the record exists
+                        tp_at_obs, obs_value = vf.read_cube(Store, BaseDateTime, StepF)
+                        Hist_day = vf.hist_EM_OBS_sorted(vf.sort_members(tp_at_obs), obs_value, VRT_Sweep)
+                        Hist = Hist_day if Hist is None else Hist + Hist_day
+                  TheDate += timedelta(days=1)
+            if Hist is None: # no records for the considered StepF
+                  continue
+            NumEM = Hist.shape[1] - 1
+
+            # Computing the scores for all the VRTs at once
+            Scores_array[:, ind_StepF, 2] = vf.BSrel_Ferro(Hist, NumEM)
+            HR, FAR, AROCt = vf.AROC_trapezoidal(Hist)
+            Scores_array[:, ind_StepF, 3] = AROCt
+            Scores_array[:, ind_StepF, 4] = vf.binormal_AROC(HR, FAR)
+
+      # Saving the scores
+      DirOUT_temp = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/"
+      FileNameOUT_temp = "BSrel_AROCt_AROCz_VRT_Sweep_" + f"{Acc:02d}" + "h_" + SystemFC
+      if not os.path.exists(DirOUT_temp):
+            os.makedirs(DirOUT_temp)
+      np.save(DirOUT_temp + "/" + FileNameOUT_temp, Scores_array)
@@ -0,0 +1,170 @@
+import os
+from datetime import datetime, timedelta
+import numpy as np
+import Verif_Functions as vf
+
+########################################################################################
+# CODE DESCRIPTION
+# 12_Compute_BSrel_AROCt_AROCz_HR_FAR_Reliability_BS.py computes, in a single pass over the stores of the counts,
+# the values of the Brier Score - Reliability component (BSrel) and of the trapezoidal and binormal areas under the
+# ROC curve (AROCt and AROCz), including bootstrapped (BS) values, the "real" and "binormal" hit rates (HRs) and
+# false alarm rates (FARs), and the reliability and sharpness tables.
+# Note: the daily joint histograms of the counts of ensemble members and observations exceeding the VRT are read
+# only once for each forecasting system, VRT and StepF, and all the scores are computed from the same histograms.
+# For each forecasting system, VRT and StepF, all the scores share the same bootstrap replicates (i.e. the same 
+# matrix with the multiplicity of the bootstrapped days). The BSrel, AROCt, AROCz, HRs and FARs (and the number of
+# bootstrap repetitions drawn) are saved with the same names and layouts as in 02_Compute_BSrel_BS.py, 
+# 06_Compute_AROCt_AROCz_BS.py and 05_Compute_Real_Binormal_HR_FAR_NoBS.py, so that the plotting scripts can read 
+# them. As in those scripts, each VRT considers the dates in its own store, so the values are the same whichever 
+# script computed them (for 02 and 06, when all the bootstrap repetitions are drawn, i.e. Tol_BS = None).
+# The reliability and sharpness tables are saved in an array of StepFs x probabilities x 6, containing the StepF 
+# (column 0), the forecast probability (column 1), the observation relative frequency (column 2), the forecast 
+# absolute frequency (column 3), and the bounds of the confidence interval of the observation relative frequency 
+# (columns 4 and 5). They are saved together with the settings used to compute them (see "save_reliability_tables" 
+# in Verif_Functions.py), and read by 04_Plot_Reliability_Sharpness_Diagrams_NoBS.py, which uses them only if its 
+# own settings are the same.
+
+# INPUT PARAMETERS DESCRIPTION
+# DateS (date, in format YYYYMMDD): start date of the considered verification period.
+# DateF (date, in format YYYYMMDD): final date of the considered verification period.
+# StepF_Start (integer, in hours): first final step of the accumulation periods to consider.
+# StepF_Final (integer, in hours): last final step of the accumulation periods to consider.
+# Disc_Step (integer, in hours): discretization for the final steps to consider.
+# Acc (number, in hours): rainfall accumulation to consider.
+# RepetitionsBS (integer, from 0 to infinite): number of repetitions to consider in the bootstrapping.
+# SeedBS (integer, from 0 to infinite): seed of the random streams of the bootstrapping (the same seed gives the same bootstrapped values).
+# BlockBS (integer, from 1 to infinite): number of bootstrap repetitions drawn from the same random stream.
+# CL_BS (integer from 0 to 100, in percent): confidence level of the confidence intervals of the observation relative frequency in the reliability tables.
+# VRT_list (list of floats, from 0 to infinite, in mm): list of verifing rainfall events (VRT).
+# SystemFC_list (list of strings): list of names of forecasting systems to consider.
+# Git_repo (string): repository's local path.
+# DirIN (string): relative path containing the stores of the counts of EM and OBS exceeding a certain VRT, and of their daily histograms.
+# DirOUT_BSrel (string): relative path of the directory containing the BSrel values, including the bootstrapped ones.
+# DirOUT_AROC (string): relative path of the directory containing the AROCt and AROCz values, including the bootstrapped ones.
+# DirOUT_HR_FAR (string): relative path of the directory containing the real and binormal HRs and FARs.
+# DirOUT_Reliability (string): relative path of the directory containing the reliability and sharpness tables.
+
+# INPUT PARAMETERS
+DateS = datetime(2021, 12, 1, 0)
+DateF = datetime(2022, 11, 30, 0)
+StepF_Start = 12
+StepF_Final = 246
+Disc_Step = 6
+Acc = 12
+RepetitionsBS = 1000
+SeedBS = 20211201
+BlockBS = 100
+CL_BS = 99
+VRT_list = [0.2, 10, 50]
+SystemFC_list = ["ENS", "ecPoint_MultipleWT", "ecPoint_SingleWT"]
+Git_repo = "/ec/vol/ecpoint_dev/mofp/Papers_2_Write/Verif_ecPoint_SingleWT"
+DirIN = "Data/Compute/01_Count_EM_OBS_Exceeding_VRT"
+DirOUT_BSrel = "Data/Compute/02_BSrel_BS"
+DirOUT_AROC = "Data/Compute/06_AROCt_AROCz_BS"
+DirOUT_HR_FAR = "Data/Compute/05_Real_Binormal_HR_FAR_NoBS"
+DirOUT_Reliability = "Data/Compute/12_Reliability_Sharpness_Tables_BS"
+########################################################################################
+
+
+# Defining the list of StepF to consider
+StepF_list = range(StepF_Start, (StepF_Final+1), Disc_Step)
+m = len(StepF_list)
+
+# Defining the settings saved with the reliability and sharpness tables
+Settings_Reliability = vf.settings_reliability_tables(DateS, DateF, StepF_list, RepetitionsBS, SeedBS, BlockBS, CL_BS)
+
+# Computing the scores for a specific forecasting system
+for SystemFC in SystemFC_list:
+
+      # Defining the n. of ensemble members for the forecasting system
+      if SystemFC == "ENS":
+            NumEM = 51
+      else:
+            NumEM = 99
+
+      # Opening the stores with the counts of ensemble members and observations exceeding the VRTs, and their daily histograms
+      Store_dict = {}
+      for VRT in VRT_list:
+            FileStore = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+            Store_dict[VRT] = vf.open_store(FileStore)
+
+      # Initializing the variables containing the scores, and the bootstrapped ones, for all VRTs
+      BSrel_dict = {VRT: np.zeros([m, RepetitionsBS+2]) for VRT in VRT_list}
+      AROCt_dict = {VRT: np.zeros([m, RepetitionsBS+2]) for VRT in VRT_list}
+      AROCz_dict = {VRT: np.zeros([m, RepetitionsBS+2]) for VRT in VRT_list}
+      Reliability_dict = {VRT: np.zeros([m, NumEM+1, 6]) for VRT in VRT_list}
+      HR_dict, FAR_dict, HRz_dict, FARz_dict = {}, {}, {}, {}
+      for VRT in VRT_list:
+            HR_dict[VRT], FAR_dict[VRT], HRz_dict[VRT], FARz_dict[VRT] = vf.new_ROC_curves(m, NumEM)
+
+      # Computing the scores for a specific lead time
+      for ind_StepF in range(m):
+
+            StepF = StepF_list[ind_StepF]
+            print("Computing BSrel, AROCt, AROCz, HRs, FARs and reliability tables for " + SystemFC + ", StepF=" + str(StepF))
+
+            # Computing the scores for a specific VRT
+            for VRT in VRT_list:
+
+                  # Selecting the dates for which the counts exist for the VRT (not all steps might have one if the forecasts did not exist)
+                  # Note: as in 02_Compute_BSrel_BS.py, 05_Compute_Real_Binormal_HR_FAR_NoBS.py and 06_Compute_AROCt_AROCz_BS.py, each VRT considers the dates in its own store.
+                  BaseDateTime_list = []
+                  TheDate = DateS
+                  while TheDate <= DateF:
+                        BaseDateTime = int(TheDate.strftime("%Y%m%d%H"))
+                        if (BaseDateTime, StepF) in Store_dict[VRT]["lookup"]:
+                              BaseDateTime_list.append(BaseDateTime)
+                        TheDate += timedelta(days=1)
+
+                  # Defining the bootstrap replicates shared by all the scores
+                  # Note: the dates and the random streams are the same as in 02_Compute_BSrel_BS.py and 06_Compute_AROCt_AROCz_BS.py (without a tolerance), so the bootstrapped values are the same.
+                  NumDays = len(BaseDateTime_list)
+                  Multiplicity = vf.multiplicity_BS(NumDays, RepetitionsBS, SeedBS, (SystemFC, VRT, StepF), BlockBS)
+
+                  # Reading the daily histograms, and computing the histograms for the original (first row) and the bootstrapped values
+                  Hist_original = np.array([vf.read_hist(Store_dict[VRT], BaseDateTime, StepF) for BaseDateTime in BaseDateTime_list]).reshape(-1, NumEM+1, 2)
+                  Hist_BS = vf.hist_BS(Hist_original, Multiplicity)
+
+                  # Computing BSrel, AROCt and AROCz for the original and the bootstrapped values
+                  BSrel_dict[VRT][ind_StepF, 0] = StepF
+                  BSrel_dict[VRT][ind_StepF, 1:] = vf.BSrel_Ferro(Hist_BS, NumEM)
+                  HR, FAR, AROCt = vf.AROC_trapezoidal(Hist_BS)
+                  AROCt_dict[VRT][ind_StepF, 0] = StepF
+                  AROCt_dict[VRT][ind_StepF, 1:] = AROCt
+                  AROCz_dict[VRT][ind_StepF, 0] = StepF
+                  AROCz_dict[VRT][ind_StepF, 1:] = vf.binormal_AROC(HR, FAR)
+
+                  # Keeping the "real" HRs and FARs, and computing the "binormal" ones from them, for the original values
+                  HR_dict[VRT][ind_StepF] = HR[0]
+                  FAR_dict[VRT][ind_StepF] = FAR[0]
+                  HRz_dict[VRT][ind_StepF], FARz_dict[VRT][ind_StepF] = vf.binormal_HR_FAR(HR[0], FAR[0])
+
+                  # Computing the reliability and sharpness tables for the original values, and the confidence intervals from the bootstrapped ones
+                  Reliability_dict[VRT][ind_StepF, :, 0] = StepF
+                  Reliability_dict[VRT][ind_StepF, :, 1:] = vf.reliability_table_BS(Hist_BS, NumEM, CL_BS)
+
+      # Defining the number of bootstrap repetitions drawn (all of them), as saved by 02_Compute_BSrel_BS.py and 06_Compute_AROCt_AROCz_BS.py
+      NumRepsBS_array = np.zeros([m, 2])
+      NumRepsBS_array[:, 0] = StepF_list
+      NumRepsBS_array[:, 1] = RepetitionsBS
+
+      # Saving BSrel, AROCt, AROCz, the number of bootstrap repetitions drawn, the "real" and "binormal" HRs and FARs, and the reliability and sharpness tables
+      for VRT in VRT_list:
+
+            print(" - Saving BSrel, AROCt, AROCz, HRs, FARs and the reliability tables for " + SystemFC + ", VRT>=" + str(VRT))
+            FileOUT_HR_FAR = Git_repo + "/" + DirOUT_HR_FAR + "/" + f"{Acc:02d}" + "h/HR_FAR_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + ".npz"
+            vf.save_ROC_curves(FileOUT_HR_FAR, StepF_list, HR_dict[VRT], FAR_dict[VRT], HRz_dict[VRT], FARz_dict[VRT])
+            FileOUT_Reliability = Git_repo + "/" + DirOUT_Reliability + "/" + f"{Acc:02d}" + "h/Reliability_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + ".npz"
+            vf.save_reliability_tables(FileOUT_Reliability, Reliability_dict[VRT], Settings_Reliability)
+            Array_dict = {
+                  DirOUT_BSrel + "/" + f"{Acc:02d}" + "h/BSrel/BSrel_": BSrel_dict[VRT],
+                  DirOUT_AROC + "/" + f"{Acc:02d}" + "h/AROCt/AROCt_": AROCt_dict[VRT],
+                  DirOUT_AROC + "/" + f"{Acc:02d}" + "h/AROCz/AROCz_": AROCz_dict[VRT],
+                  DirOUT_BSrel + "/" + f"{Acc:02d}" + "h/NumRepsBS/NumRepsBS_": NumRepsBS_array,
+                  DirOUT_AROC + "/" + f"{Acc:02d}" + "h/NumRepsBS/NumRepsBS_": NumRepsBS_array
+                  }
+            for FileOUT_temp, Array_temp in Array_dict.items():
+                  DirOUT_temp = os.path.dirname(Git_repo + "/" + FileOUT_temp)
+                  if not os.path.exists(DirOUT_temp):
+                        os.makedirs(DirOUT_temp)
+                  np.save(Git_repo + "/" + FileOUT_temp + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT), Array_temp)
@@ -0,0 +1,81 @@
+import sys
+from datetime import datetime, timedelta
+import Verif_Functions as vf
+
+########################################################################################
+# CODE DESCRIPTION
+# 13_Compute_Poisson_BS_Accumulators.py computes the accumulators of the streaming bootstrap (with Poisson weights)
+# for a period of base dates. The accumulators contain the joint histograms of the counts of ensemble members and
+# observations exceeding the VRT for the original sample and for all the bootstrap replicates.
+# Note: the daily histograms are read one at a time and folded into the accumulators, so the memory needed does not
+# depend on the number of days (see "add_day_accumulator" in Verif_Functions.py). The period can be split into
+# shorter periods computed by separate jobs, whose accumulators (shards) are merged by
+# 14_Compute_BSrel_AROCt_AROCz_Poisson_BS.py. The shards must not overlap.
+
+# INPUT PARAMETERS DESCRIPTION
+# DateS (date, in format YYYYMMDD): start date of the considered period.
+# DateF (date, in format YYYYMMDD): final date of the considered period.
+# StepF_Start (integer, in hours): first final step of the accumulation periods to consider.
+# StepF_Final (integer, in hours): last final step of the accumulation periods to consider.
+# Disc_Step (integer, in hours): discretization for the final steps to consider.
+# Acc (number, in hours): rainfall accumulation to consider.
+# RepetitionsBS (integer, from 0 to infinite): number of repetitions to consider in the bootstrapping.
+# SeedBS (integer, from 0 to infinite): seed of the Poisson weights of the bootstrapping (the same seed gives the same bootstrapped values).
+# VRT_list (list of floats, from 0 to infinite, in mm): list of verifing rainfall events (VRT).
+# SystemFC_list (list of strings): list of names of forecasting systems to consider.
+# Git_repo (string): repository's local path.
+# DirIN (string): relative path containing the stores of the counts of EM and OBS exceeding a certain VRT, and of their daily histograms.
+# DirOUT (string): relative path of the directory containing the accumulators of the streaming bootstrap.
+
+# INPUT PARAMETERS
+DateS = sys.argv[1]
+DateF = sys.argv[2]
+StepF_Start = 12
+StepF_Final = 246
+Disc_Step = 6
+Acc = 12
+RepetitionsBS = 1000
+SeedBS = 20211201
+VRT_list = [0.2, 10, 50]
+SystemFC_list = ["ENS", "ecPoint_MultipleWT", "ecPoint_SingleWT"]
+Git_repo = "/ec/vol/ecpoint_dev/mofp/Papers_2_Write/Verif_ecPoint_SingleWT"
+DirIN = "Data/Compute/01_Count_EM_OBS_Exceeding_VRT"
+DirOUT = "Data/Compute/13_Poisson_BS_Accumulators"
+########################################################################################
+
+
+# Converting the strings into datetime objects
+DateS = datetime.strptime(DateS, "%Y%m%d")
+DateF = datetime.strptime(DateF, "%Y%m%d")
+
+# Computing the accumulators for a specific forecasting system
+for SystemFC in SystemFC_list:
+
+      # Defining the n. of ensemble members for the forecasting system
+      if SystemFC == "ENS":
+            NumEM = 51
+      else:
+            NumEM = 99
+
+      # Computing the accumulators for a specific VRT
+      for VRT in VRT_list:
+
+            # Opening the store with the counts of ensemble members and observations exceeding the VRT, and their daily histograms
+            FileStore = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+            Store = vf.open_store(FileStore)
+
+            # Folding the daily histograms into the accumulators of a specific lead time
+            Acc_dict = {}
+            for StepF in range(StepF_Start, (StepF_Final+1), Disc_Step):
+                  print("Computing the accumulators for " + SystemFC + ", VRT>=" + str(VRT) + ", StepF=" + str(StepF))
+                  Acc_dict[StepF] = vf.new_accumulator(RepetitionsBS, NumEM)
+                  TheDate = DateS
+                  while TheDate <= DateF:
+                        BaseDateTime = int(TheDate.strftime("%Y%m%d%H"))
+                        if (BaseDateTime, StepF) in Store["lookup"]: # proceed if the record exists
+                              vf.add_day_accumulator(Acc_dict[StepF], vf.read_hist(Store, BaseDateTime, StepF), SeedBS, (SystemFC, VRT, StepF), BaseDateTime)
+                        TheDate += timedelta(days=1)
+
+            # Saving the accumulators (shard) for the considered period
+            FileOUT = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/Shards/" + SystemFC + "/" + str(VRT) + "/Acc_Poisson_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + "_" + DateS.strftime("%Y%m%d") + "_" + DateF.strftime("%Y%m%d") + ".npz"
+            vf.save_accumulators(FileOUT, Acc_dict)
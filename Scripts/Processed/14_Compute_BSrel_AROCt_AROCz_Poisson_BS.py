@@ -0,0 +1,66 @@
+import os
+import glob
+import numpy as np
+import Verif_Functions as vf
+
+########################################################################################
+# CODE DESCRIPTION
+# 14_Compute_BSrel_AROCt_AROCz_Poisson_BS.py merges the accumulators of the streaming bootstrap (with Poisson
+# weights) computed by 13_Compute_Poisson_BS_Accumulators.py for separate periods (shards), and computes the values
+# of the Brier Score - Reliability component (BSrel), and of the trapezoidal and binormal areas under the ROC curve
+# (AROCt and AROCz), including bootstrapped (BS) values.
+# Note: the merged accumulators are saved, so that new days can be added (or old days removed) without reading
+# again all the days. 17_Compute_Incremental_Update_Poisson_BS.py only reads them (to initialise its own 
+# accumulators), so they always contain exactly the shards. BSrel, AROCt and AROCz are saved with the same layout 
+# as in 02_Compute_BSrel_BS.py and 06_Compute_AROCt_AROCz_BS.py (StepF in column 0, original value in column 1, 
+# and bootstrapped values in the following columns). The bootstrapped values differ from the ones of 02 and 06, as 
+# each day enters each bootstrap repetition a Poisson-distributed number of times (instead of drawing exactly the 
+# number of days).
+
+# INPUT PARAMETERS DESCRIPTION
+# Acc (number, in hours): rainfall accumulation to consider.
+# VRT_list (list of floats, from 0 to infinite, in mm): list of verifing rainfall events (VRT).
+# SystemFC_list (list of strings): list of names of forecasting systems to consider.
+# Git_repo (string): repository's local path.
+# DirIN (string): relative path containing the accumulators (shards) of the streaming bootstrap.
+# DirOUT (string): relative path of the directory containing the merged accumulators, and the BSrel, AROCt and AROCz values, including the bootstrapped ones.
+
+# INPUT PARAMETERS
+Acc = 12
+VRT_list = [0.2, 10, 50]
+SystemFC_list = ["ENS", "ecPoint_MultipleWT", "ecPoint_SingleWT"]
+Git_repo = "/ec/vol/ecpoint_dev/mofp/Papers_2_Write/Verif_ecPoint_SingleWT"
+DirIN = "Data/Compute/13_Poisson_BS_Accumulators"
+DirOUT = "Data/Compute/14_BSrel_AROCt_AROCz_Poisson_BS"
+########################################################################################
+
+
+# Computing the scores for a specific forecasting system
+for SystemFC in SystemFC_list:
+
+      # Defining the n. of ensemble members for the forecasting system
+      if SystemFC == "ENS":
+            NumEM = 51
+      else:
+            NumEM = 99
+
+      # Computing the scores for a specific VRT
+      for VRT in VRT_list:
+
+            # Merging the accumulators of all the shards
+            print("Merging the accumulators and computing BSrel, AROCt and AROCz for " + SystemFC + ", VRT>=" + str(VRT))
+            FileIN_list = sorted(glob.glob(Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/Shards/" + SystemFC + "/" + str(VRT) + "/Acc_Poisson_*.npz"))
+            Acc_dict = vf.merge_accumulators([vf.load_accumulators(FileIN) for FileIN in FileIN_list])
+            FileOUT = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/Accumulators/Acc_Poisson_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + ".npz"
+            vf.save_accumulators(FileOUT, Acc_dict)
+
+            # Computing BSrel, AROCt and AROCz for the original and the bootstrapped values of all lead times
+            BSrel_array, AROCt_array, AROCz_array = vf.scores_accumulators(Acc_dict, NumEM)
+
+            # Saving BSrel, AROCt and AROCz
+            for Score, Score_array in [("BSrel", BSrel_array), ("AROCt", AROCt_array), ("AROCz", AROCz_array)]:
+                  DirOUT_temp = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/" + Score + "/"
+                  FileNameOUT_temp = Score + "_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+                  if not os.path.exists(DirOUT_temp):
+                        os.makedirs(DirOUT_temp)
+                  np.save(DirOUT_temp + "/" + FileNameOUT_temp, Score_array)
@@ -0,0 +1,82 @@
+import sys
+from datetime import datetime, timedelta
+import numpy as np
+import Verif_Functions as vf
+
+########################################################################################
+# CODE DESCRIPTION
+# 15_Compute_Prefix_Sum_Index.py computes the prefix-sum index of the daily joint histograms of the counts of 
+# ensemble members and observations exceeding the VRT, over the base dates and the StepFs.
+# Note: with the index, the histogram for any window of consecutive base dates and StepFs (e.g. a season, or the 
+# StepFs of day 1 to 3 pooled together) is computed with only four prefix sums (see "query_prefix" in 
+# Verif_Functions.py), so the scores for any window are computed in a few seconds by 
+# 16_Compute_BSrel_AROCt_AROCz_Window_NoBS.py, without re-running the computations over the whole period.
+
+# INPUT PARAMETERS DESCRIPTION
+# DateS (date, in format YYYYMMDD): start date of the considered verification period.
+# DateF (date, in format YYYYMMDD): final date of the considered verification period.
+# StepF_Start (integer, in hours): first final step of the accumulation periods to consider.
+# StepF_Final (integer, in hours): last final step of the accumulation periods to consider.
+# Disc_Step (integer, in hours): discretization for the final steps to consider.
+# Acc (number, in hours): rainfall accumulation to consider.
+# VRT_list (list of floats, from 0 to infinite, in mm): list of verifing rainfall events (VRT).
+# SystemFC_list (list of strings): list of names of forecasting systems to consider.
+# Git_repo (string): repository's local path.
+# DirIN (string): relative path containing the stores of the counts of EM and OBS exceeding a certain VRT, and of their daily histograms.
+# DirOUT (string): relative path of the directory containing the prefix-sum indexes.
+
+# INPUT PARAMETERS
+DateS = sys.argv[1]
+DateF = sys.argv[2]
+StepF_Start = 12
+StepF_Final = 246
+Disc_Step = 6
+Acc = 12
+VRT_list = [0.2, 10, 50]
+SystemFC_list = ["ENS", "ecPoint_MultipleWT", "ecPoint_SingleWT"]
+Git_repo = "/ec/vol/ecpoint_dev/mofp/Papers_2_Write/Verif_ecPoint_SingleWT"
+DirIN = "Data/Compute/01_Count_EM_OBS_Exceeding_VRT"
+DirOUT = "Data/Compute/15_Prefix_Sum_Index"
+########################################################################################
+
+
+# Converting the strings into datetime objects
+DateS = datetime.strptime(DateS, "%Y%m%d")
+DateF = datetime.strptime(DateF, "%Y%m%d")
+
+# Defining the lists of base dates and StepFs to consider
+BaseDateTime_list = []
+TheDate = DateS
+while TheDate <= DateF:
+      BaseDateTime_list.append(int(TheDate.strftime("%Y%m%d%H")))
+      TheDate += timedelta(days=1)
+StepF_list = range(StepF_Start, (StepF_Final+1), Disc_Step)
+
+# Computing the prefix-sum index for a specific forecasting system
+for SystemFC in SystemFC_list:
+
+      # Defining the n. of ensemble members for the forecasting system
+      if SystemFC == "ENS":
+            NumEM = 51
+      else:
+            NumEM = 99
+
+      # Computing the prefix-sum index for a specific VRT
+      for VRT in VRT_list:
+
+            print("Computing the prefix-sum index for " + SystemFC + ", VRT>=" + str(VRT))
+
+            # Opening the store with the counts of ensemble members and observations exceeding the VRT, and their daily histograms
+            FileStore = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+            Store = vf.open_store(FileStore)
+
+            # Reading the daily histograms for all base dates and StepFs (zeros if the record does not exist)
+            Hist_Days_Steps = np.zeros([len(BaseDateTime_list), len(StepF_list), NumEM+1, 2], dtype=np.int64)
+            for ind_Date in range(len(BaseDateTime_list)):
+                  for ind_StepF in range(len(StepF_list)):
+                        if (BaseDateTime_list[ind_Date], StepF_list[ind_StepF]) in Store["lookup"]: # proceed if the record exists
+                              Hist_Days_Steps[ind_Date, ind_StepF] = vf.read_hist(Store, BaseDateTime_list[ind_Date], StepF_list[ind_StepF])
+
+            # Saving the prefix-sum index
+            FileOUT = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/Prefix_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + ".npz"
+            vf.save_prefix(FileOUT, vf.prefix_hist(Hist_Days_Steps), BaseDateTime_list, StepF_list)
@@ -0,0 +1,67 @@
+import os
+import sys
+import numpy as np
+import Verif_Functions as vf
+
+########################################################################################
+# CODE DESCRIPTION
+# 16_Compute_BSrel_AROCt_AROCz_Window_NoBS.py computes the values of the Brier Score - Reliability component 
+# (BSrel), and of the trapezoidal and binormal areas under the ROC curve (AROCt and AROCz), for a window of 
+# consecutive base dates and StepFs (e.g. a season, and the StepFs of day 1 to 3 pooled together).
+# Note: the histogram for the window is read from the prefix-sum index computed by 15_Compute_Prefix_Sum_Index.py, 
+# so the computations do not depend on the size of the window. The values are saved in an array with the forecasting
+# systems as rows, and BSrel (column 0), AROCt (column 1) and AROCz (column 2) as columns.
+
+# INPUT PARAMETERS DESCRIPTION
+# DateS_Window (date, in format YYYYMMDD): first base date of the window.
+# DateF_Window (date, in format YYYYMMDD): last base date of the window.
+# StepF_Start_Window (integer, in hours): first final step of the accumulation periods of the window.
+# StepF_Final_Window (integer, in hours): last final step of the accumulation periods of the window.
+# Acc (number, in hours): rainfall accumulation to consider.
+# VRT_list (list of floats, from 0 to infinite, in mm): list of verifing rainfall events (VRT).
+# SystemFC_list (list of strings): list of names of forecasting systems to consider.
+# Git_repo (string): repository's local path.
+# DirIN (string): relative path containing the prefix-sum indexes.
+# DirOUT (string): relative path of the directory containing the BSrel, AROCt and AROCz values for the windows.
+
+# INPUT PARAMETERS
+DateS_Window = sys.argv[1]
+DateF_Window = sys.argv[2]
+StepF_Start_Window = int(sys.argv[3])
+StepF_Final_Window = int(sys.argv[4])
+Acc = 12
+VRT_list = [0.2, 10, 50]
+SystemFC_list = ["ENS", "ecPoint_MultipleWT", "ecPoint_SingleWT"]
+Git_repo = "/ec/vol/ecpoint_dev/mofp/Papers_2_Write/Verif_ecPoint_SingleWT"
+DirIN = "Data/Compute/15_Prefix_Sum_Index"
+DirOUT = "Data/Compute/16_BSrel_AROCt_AROCz_Window_NoBS"
+########################################################################################
+
+
+# Computing the scores for a specific VRT
+for VRT in VRT_list:
+
+      Scores_array = np.full([len(SystemFC_list), 3], np.nan)
+
+      # Computing the scores for a specific forecasting system
+      for ind_SystemFC in range(len(SystemFC_list)):
+
+            SystemFC = SystemFC_list[ind_SystemFC]
+            
+            # Reading the histogram for the window from the prefix-sum index
+            FileIN = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/Prefix_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + ".npz"
+            Prefix_Index = vf.load_prefix(FileIN)
+            Hist = vf.query_prefix(Prefix_Index, int(DateS_Window + "00"), int(DateF_Window + "00"), StepF_Start_Window, StepF_Final_Window)
+            NumEM = Hist.shape[0] - 1
+
+            # Computing BSrel, AROCt and AROCz
+            Scores_array[ind_SystemFC, 0] = vf.BSrel_Ferro(Hist, NumEM)
+            Scores_array[ind_SystemFC, 1:] = vf.AROCt_AROCz(Hist)
+            print(SystemFC + ", VRT>=" + str(VRT) + ", " + DateS_Window + "-" + DateF_Window + ", StepF=" + str(StepF_Start_Window) + "-" + str(StepF_Final_Window) + ": BSrel=" + str(Scores_array[ind_SystemFC, 0]) + ", AROCt=" + str(Scores_array[ind_SystemFC, 1]) + ", AROCz=" + str(Scores_array[ind_SystemFC, 2]))
+
+      # Saving the scores
+      DirOUT_temp = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/"
+      FileNameOUT_temp = "BSrel_AROCt_AROCz_" + f"{Acc:02d}" + "h_" + str(VRT) + "_" + DateS_Window + "_" + DateF_Window + "_" + f"{StepF_Start_Window:03d}" + "_" + f"{StepF_Final_Window:03d}"
+      if not os.path.exists(DirOUT_temp):
+            os.makedirs(DirOUT_temp)
+      np.save(DirOUT_temp + "/" + FileNameOUT_temp, Scores_array)
@@ -0,0 +1,136 @@
+import os
+import sys
+import subprocess
+from datetime import datetime, timedelta
+import numpy as np
+import Verif_Functions as vf
+
+########################################################################################
+# CODE DESCRIPTION
+# 17_Compute_Incremental_Update_Poisson_BS.py updates the values of BSrel, AROCt and AROCz computed with the 
+# streaming bootstrap (with Poisson weights), including the bootstrapped ones, when new base dates become available.
+# It computes the counts of ensemble members and observations exceeding the VRT only for the new base dates (with 
+# 01_Compute_Count_EM_OBS_Exceeding_VRT.py, for the same forecasting systems, VRTs and StepFs as in this script), and 
+# adds their daily histograms to its accumulators.
+# Note: the accumulators of this script, and the values of BSrel, AROCt and AROCz computed from them, are saved in its 
+# own directory. At the first run (when they do not exist), the accumulators are initialised with the merged 
+# accumulators saved by 14_Compute_BSrel_AROCt_AROCz_Poisson_BS.py, which are only read. Thus, re-running 14 does 
+# not drop the updates of this script (delete the accumulators of this script to start again from the ones of 14).
+# Note: the older base dates are not read again, as their contribution is already in the accumulators. If a rolling
+# window is considered, the base dates that leave the window are removed from the accumulators (reading only their
+# daily histograms). The base dates already in the accumulators are not added again, so the script can be re-run.
+# Note: only the scores of the streaming bootstrap are updated. The other verification results (computed by 02, 05, 
+# 06 and 12, and the reliability tables plotted by 04) are not updated, and must be recomputed for the new 
+# verification period (after the counts have been computed by this script).
+
+# INPUT PARAMETERS DESCRIPTION
+# DateS_New (date, in format YYYYMMDD): first new base date.
+# DateF_New (date, in format YYYYMMDD): last new base date.
+# Window_Days (integer, from 1 to infinite, or None): length of the rolling window (in days, ending at DateF_New) of the base dates to consider (None to keep all the base dates).
+# Run_01 (boolean): if True, the counts for the new base dates are computed with 01_Compute_Count_EM_OBS_Exceeding_VRT.py.
+# StepF_Start (integer, in hours): first final step of the accumulation periods to consider.
+# StepF_Final (integer, in hours): last final step of the accumulation periods to consider.
+# Disc_Step (integer, in hours): discretization for the final steps to consider.
+# Acc (number, in hours): rainfall accumulation to consider.
+# RepetitionsBS (integer, from 0 to infinite): number of repetitions to consider in the bootstrapping (used only for new accumulators).
+# SeedBS (integer, from 0 to infinite): seed of the Poisson weights of the bootstrapping (the same as in 13_Compute_Poisson_BS_Accumulators.py).
+# VRT_list (list of floats, from 0 to infinite, in mm): list of verifing rainfall events (VRT).
+# SystemFC_list (list of strings): list of names of forecasting systems to consider.
+# Git_repo (string): repository's local path.
+# DirIN (string): relative path containing the stores of the counts of EM and OBS exceeding a certain VRT, and of their daily histograms.
+# DirIN_Acc (string): relative path of the directory containing the merged accumulators of 14_Compute_BSrel_AROCt_AROCz_Poisson_BS.py (used to initialise the accumulators).
+# DirOUT (string): relative path of the directory containing the updated accumulators, and the BSrel, AROCt and AROCz values, including the bootstrapped ones.
+
+# INPUT PARAMETERS
+DateS_New = sys.argv[1]
+DateF_New = sys.argv[2]
+Window_Days = None
+Run_01 = True
+StepF_Start = 12
+StepF_Final = 246
+Disc_Step = 6
+Acc = 12
+RepetitionsBS = 1000
+SeedBS = 20211201
+VRT_list = [0.2, 10, 50]
+SystemFC_list = ["ENS", "ecPoint_MultipleWT", "ecPoint_SingleWT"]
+Git_repo = "/ec/vol/ecpoint_dev/mofp/Papers_2_Write/Verif_ecPoint_SingleWT"
+DirIN = "Data/Compute/01_Count_EM_OBS_Exceeding_VRT"
+DirIN_Acc = "Data/Compute/14_BSrel_AROCt_AROCz_Poisson_BS"
+DirOUT = "Data/Compute/17_Incremental_Update_Poisson_BS"
+########################################################################################
+
+
+# Computing the counts for the new base dates
+# Note: 01_Compute_Count_EM_OBS_Exceeding_VRT.py (in the same directory as this script) skips the counts already in the stores.
+if Run_01:
+      File_01 = os.path.join(os.path.dirname(os.path.abspath(__file__)), "01_Compute_Count_EM_OBS_Exceeding_VRT.py")
+      StepF_arg = str(StepF_Start) + "," + str(StepF_Final) + "," + str(Disc_Step)
+      VRT_arg = ",".join([str(VRT) for VRT in VRT_list])
+      SystemFC_arg = ",".join(SystemFC_list)
+      subprocess.run([sys.executable, File_01, DateS_New, DateF_New, StepF_arg, VRT_arg, SystemFC_arg], check=True)
+
+# Defining the new base dates, and the first base date of the rolling window
+BaseDateTime_New_list = []
+TheDate = datetime.strptime(DateS_New, "%Y%m%d")
+while TheDate <= datetime.strptime(DateF_New, "%Y%m%d"):
+      BaseDateTime_New_list.append(int(TheDate.strftime("%Y%m%d%H")))
+      TheDate += timedelta(days=1)
+if Window_Days is not None:
+      BaseDateTime_Window = int((datetime.strptime(DateF_New, "%Y%m%d") - timedelta(days=(Window_Days-1))).strftime("%Y%m%d%H"))
+
+# Updating the accumulators for a specific forecasting system
+for SystemFC in SystemFC_list:
+
+      # Defining the n. of ensemble members for the forecasting system
+      if SystemFC == "ENS":
+            NumEM = 51
+      else:
+            NumEM = 99
+
+      # Updating the accumulators for a specific VRT
+      for VRT in VRT_list:
+
+            print("Updating the accumulators and refreshing BSrel, AROCt and AROCz for " + SystemFC + ", VRT>=" + str(VRT))
+
+            # Opening the store with the counts of ensemble members and observations exceeding the VRT, and their daily histograms
+            FileStore = Git_repo + "/" + DirIN + "/" + f"{Acc:02d}" + "h/" + SystemFC + "/Count_EM_OBS_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+            Store = vf.open_store(FileStore)
+
+            # Reading the accumulators of this script, or the merged accumulators of 14 at the first run (if they exist)
+            FileAcc = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/Accumulators/Acc_Poisson_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + ".npz"
+            FileAcc_14 = Git_repo + "/" + DirIN_Acc + "/" + f"{Acc:02d}" + "h/Accumulators/Acc_Poisson_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT) + ".npz"
+            if os.path.isfile(FileAcc):
+                  Acc_dict = vf.load_accumulators(FileAcc)
+            elif os.path.isfile(FileAcc_14):
+                  Acc_dict = vf.load_accumulators(FileAcc_14)
+            else:
+                  Acc_dict = {}
+
+            # Updating the accumulators for a specific lead time
+            for StepF in range(StepF_Start, (StepF_Final+1), Disc_Step):
+
+                  if StepF not in Acc_dict:
+                        Acc_dict[StepF] = vf.new_accumulator(RepetitionsBS, NumEM)
+
+                  # Adding the new base dates
+                  for BaseDateTime in BaseDateTime_New_list:
+                        if (BaseDateTime, StepF) in Store["lookup"] and BaseDateTime not in Acc_dict[StepF]["days"]:
+                              vf.add_day_accumulator(Acc_dict[StepF], vf.read_hist(Store, BaseDateTime, StepF), SeedBS, (SystemFC, VRT, StepF), BaseDateTime)
+
+                  # Removing the base dates that left the rolling window
+                  if Window_Days is not None:
+                        for BaseDateTime in Acc_dict[StepF]["days"][Acc_dict[StepF]["days"] < BaseDateTime_Window]:
+                              vf.remove_day_accumulator(Acc_dict[StepF], vf.read_hist(Store, int(BaseDateTime), StepF), SeedBS, (SystemFC, VRT, StepF), int(BaseDateTime))
+
+            # Saving the updated accumulators
+            vf.save_accumulators(FileAcc, Acc_dict)
+
+            # Refreshing BSrel, AROCt and AROCz for the original and the bootstrapped values of all lead times
+            BSrel_array, AROCt_array, AROCz_array = vf.scores_accumulators(Acc_dict, NumEM)
+            for Score, Score_array in [("BSrel", BSrel_array), ("AROCt", AROCt_array), ("AROCz", AROCz_array)]:
+                  DirOUT_temp = Git_repo + "/" + DirOUT + "/" + f"{Acc:02d}" + "h/" + Score + "/"
+                  FileNameOUT_temp = Score + "_" + f"{Acc:02d}" + "h_" + SystemFC + "_" + str(VRT)
+                  if not os.path.exists(DirOUT_temp):
+                        os.makedirs(DirOUT_temp)
+                  np.save(DirOUT_temp + "/" + FileNameOUT_temp, Score_array)
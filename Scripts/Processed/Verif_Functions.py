@@ -0,0 +1,705 @@
+import os
+import fcntl
+import zlib
+import warnings
+from datetime import timedelta
+import numpy as np
+from scipy.stats import norm
+
+########################################################################################
+# CODE DESCRIPTION
+# Verif_Functions.py contains the functions shared by the numbered scripts in this directory. It is not meant
+# to be run, but imported by the scripts (e.g. "import Verif_Functions as vf").
+########################################################################################
+
+
+###########################################################################
+# Joint histogram of the counts of ensemble members and observations exceeding the VRT #
+###########################################################################
+
+# Note: the element [k, o] of the histogram contains the number of stations where k ensemble members exceed the
+# VRT and the observation exceeds (o=1) or does not exceed (o=0) the VRT.
+def hist_EM_OBS(count_em, count_obs, NumEM):
+
+      count_em = np.asarray(count_em).astype(np.int64)
+      count_obs = (np.asarray(count_obs) > 0).astype(np.int64)
+      hist = np.bincount(count_em * 2 + count_obs, minlength=(NumEM+1)*2).reshape(NumEM+1, 2)
+
+      return hist
+
+
+#########################################################################
+# Counts of ensemble members exceeding many VRTs from the sorted ensemble members #
+#########################################################################
+
+# Note: when the ensemble members are sorted in ascending order at each station (e.g. the ecPoint percentiles), the 
+# count of members exceeding a VRT is the number of members minus the position of the first member exceeding the 
+# VRT. The position is found with a binary search run at once for all stations and all VRTs, so that the cost of 
+# each additional VRT is only log2(NumEM) comparisons per station. The members that are not sorted (e.g. ENS) are 
+# sorted once per station. Missing values (NaN) are sorted last and are never counted as exceeding the VRT. The 
+# joint histograms for all the VRTs are then computed at once (e.g. for a dense sweep of VRTs).
+def sort_members(tp_at_obs):
+
+      tp_at_obs = np.asarray(tp_at_obs)
+      if np.all(tp_at_obs[1:] >= tp_at_obs[:-1]):
+            return tp_at_obs
+      
+      return np.sort(tp_at_obs, axis=0)
+
+def count_exceeding_sorted(tp_sorted, VRT_list):
+
+      NumEM, NumStations = tp_sorted.shape
+      VRT_array = np.asarray(VRT_list, dtype=np.float64).reshape(-1, 1)
+      ind_stations = np.arange(NumStations)
+
+      # Searching, for each VRT and station, the position of the first member exceeding the VRT
+      lo = np.zeros([len(VRT_array), NumStations], dtype=np.int64)
+      hi = np.full([len(VRT_array), NumStations], NumEM, dtype=np.int64)
+      while np.any(lo < hi):
+            active = lo < hi
+            mid = (lo + hi) // 2
+            below = tp_sorted[np.minimum(mid, NumEM - 1), ind_stations] < VRT_array
+            lo = np.where(active & below, mid + 1, lo)
+            hi = np.where(active & ~below, mid, hi)
+      
+      # Counting the members exceeding the VRT, excluding the missing values
+      NumValid = np.sum(~np.isnan(tp_sorted), axis=0)
+      count_em = np.maximum(NumValid - lo, 0).astype(np.uint8)
+
+      return count_em
+
+def hist_EM_OBS_sorted(tp_sorted, obs_value, VRT_list):
+
+      # Computing the joint histograms for all the VRTs with a single bincount (the histograms of the different VRTs are 
+      # placed one after the other)
+      NumEM = tp_sorted.shape[0]
+      count_em = count_exceeding_sorted(tp_sorted, VRT_list).astype(np.int64)
+      count_obs = (np.asarray(obs_value) >= np.asarray(VRT_list, dtype=np.float64).reshape(-1, 1)).astype(np.int64)
+      offset = np.arange(len(VRT_list)).reshape(-1, 1) * (NumEM+1) * 2
+      hist = np.bincount((offset + count_em * 2 + count_obs).ravel(), minlength=len(VRT_list)*(NumEM+1)*2)
+
+      return hist.reshape(len(VRT_list), NumEM+1, 2)
+
+
+##################################################################
+# Append-only store of the records of the counts (or other station payloads) #
+##################################################################
+
+# Note: a store is made of two files. The file ".bin" contains the contiguous payloads of all the records, and the 
+# file ".idx" contains, for each record, its keys (e.g. base date as YYYYMMDDHH, and StepF), the position of its 
+# payload in the file ".bin", and its size. New records are always appended at the end of both files (under a lock, 
+# so that parallel runs can write in the same store), so that the store is never rewritten. If a record is written 
+# more than once, the last one is considered. The payloads are read as zero-copy views of a memory-mapped file.
+Index_dtype = np.dtype([("Key1", "<i8"), ("Key2", "<i8"), ("Offset", "<i8"), ("NumBytes", "<i8"), ("NumStations", "<i8"), ("NumEM", "<i8")])
+
+def append_store(FileStore, Key1, Key2, NumStations, NumEM, payload_list):
+
+      DirStore = os.path.dirname(FileStore)
+      if not os.path.exists(DirStore):
+            os.makedirs(DirStore, exist_ok=True)
+
+      # Building the payload (padded to 8 bytes to keep the following records aligned)
+      payload = b"".join(np.ascontiguousarray(elem).tobytes() for elem in payload_list)
+      payload += bytes(-len(payload) % 8)
+
+      with open(FileStore + ".lock", "a") as f_lock:
+            fcntl.flock(f_lock, fcntl.LOCK_EX)
+            try:
+                  with open(FileStore + ".bin", "ab") as f_bin:
+                        Offset = f_bin.seek(0, os.SEEK_END)
+                        f_bin.write(payload)
+                  record = np.array([(Key1, Key2, Offset, len(payload), NumStations, NumEM)], dtype=Index_dtype)
+                  with open(FileStore + ".idx", "ab") as f_idx:
+                        f_idx.write(record.tobytes())
+            finally:
+                  fcntl.flock(f_lock, fcntl.LOCK_UN)
+
+def open_store(FileStore):
+
+      store = {"index": np.zeros(0, dtype=Index_dtype), "payload": None, "lookup": {}}
+      if os.path.isfile(FileStore + ".idx") and os.path.isfile(FileStore + ".bin") and os.path.getsize(FileStore + ".bin") > 0:
+            index = np.fromfile(FileStore + ".idx", dtype=np.uint8)
+            index = index[:(len(index) // Index_dtype.itemsize) * Index_dtype.itemsize].view(Index_dtype) # only complete records
+            store["index"] = index
+            store["payload"] = np.memmap(FileStore + ".bin", dtype=np.uint8, mode="r")
+            store["lookup"] = {(int(rec["Key1"]), int(rec["Key2"])): ind for ind, rec in enumerate(index)} # the last record wins
+      
+      return store
+
+def read_store(store, Key1, Key2):
+
+      rec = store["index"][store["lookup"][(Key1, Key2)]]
+      payload = store["payload"][rec["Offset"]:(rec["Offset"] + rec["NumBytes"])]
+
+      return payload, int(rec["NumStations"]), int(rec["NumEM"])
+
+
+#############################################
+# Records of the counts of ensemble members and observations #
+#############################################
+
+# Note: each record contains the daily joint histogram (int64), followed by the counts of ensemble members exceeding 
+# the VRT at each station (uint8, as they cannot exceed the number of ensemble members), and by the observations 
+# exceeding the VRT (one bit per station, packed with np.packbits). The counts of ensemble members are read as 
+# zero-copy views, while the observations are unpacked into arrays of 0s and 1s (uint8).
+def append_counts(FileStore, BaseDateTime, StepF, count_em, count_obs, NumEM):
+
+      if NumEM > np.iinfo(np.uint8).max:
+            raise ValueError("The counts of " + str(NumEM) + " ensemble members cannot be stored as uint8")
+      count_em = np.asarray(count_em).astype(np.uint8)
+      count_obs = np.asarray(count_obs) > 0
+      hist = hist_EM_OBS(count_em, count_obs, NumEM).astype("<i8")
+      append_store(FileStore, BaseDateTime, StepF, len(count_em), NumEM, [hist, count_em, np.packbits(count_obs)])
+
+def read_hist(store, BaseDateTime, StepF):
+
+      payload, NumStations, NumEM = read_store(store, BaseDateTime, StepF)
+      hist = payload[:(NumEM+1)*2*8].view("<i8").reshape(NumEM+1, 2)
+      if hist.sum() != NumStations: # each station is counted once in the histogram
+            raise ValueError("The histogram of the record (" + str(BaseDateTime) + ", " + str(StepF) + ") does not contain " + str(NumStations) + " stations")
+
+      return hist
+
+def read_count_em(store, BaseDateTime, StepF):
+
+      payload, NumStations, NumEM = read_store(store, BaseDateTime, StepF)
+      Start = (NumEM+1)*2*8
+
+      return payload[Start:(Start + NumStations)]
+
+def read_count_obs(store, BaseDateTime, StepF):
+
+      payload, NumStations, NumEM = read_store(store, BaseDateTime, StepF)
+      Start = (NumEM+1)*2*8 + NumStations
+      
+      return np.unpackbits(payload[Start:(Start + (NumStations+7)//8)], count=NumStations)
+
+def read_counts(store, BaseDateTime, StepF):
+
+      return read_count_em(store, BaseDateTime, StepF), read_count_obs(store, BaseDateTime, StepF)
+
+
+
+#########################################################
+# Cube of the forecasts and observations at the stations #
+#########################################################
+
+# Note: each record contains the forecasts at the observations' locations (ensemble members x stations) for one 
+# base date and StepF, so that the counts for new VRTs (or continuous scores) can be computed without reading the 
+# raw forecasts again. The record contains the quantisation scale (float64, number of quantisation steps per mm), 
+# the observations (float64), and the forecasts quantised as uint16 (truncated to the quantisation step, with 
+# 65535 marking the missing values) and compressed with zlib. With a scale of 100 (steps of 0.01 mm), the quantised 
+# forecasts exceed a VRT with up to two decimal digits exactly when the original forecasts do.
+Missing_Cube = np.iinfo(np.uint16).max
+
+def append_cube(FileStore, BaseDateTime, StepF, tp_at_obs, obs_value, Scale):
+
+      tp_at_obs = np.asarray(tp_at_obs, dtype=np.float64)
+      NumEM, NumStations = tp_at_obs.shape
+      with np.errstate(invalid="ignore"):
+            tp_quant = np.floor(np.round(tp_at_obs * Scale, 6))
+      tp_quant = np.where(np.isnan(tp_quant), Missing_Cube, np.clip(tp_quant, 0, Missing_Cube - 1)).astype("<u2")
+      header = np.array([Scale], dtype="<f8")
+      obs_value = np.asarray(obs_value, dtype="<f8")
+      append_store(FileStore, BaseDateTime, StepF, NumStations, NumEM, [header, obs_value, np.frombuffer(zlib.compress(tp_quant.tobytes(), 1), dtype=np.uint8)])
+
+def read_cube(store, BaseDateTime, StepF):
+
+      payload, NumStations, NumEM = read_store(store, BaseDateTime, StepF)
+      Scale = payload[:8].view("<f8")[0]
+      obs_value = payload[8:(8 + NumStations*8)].view("<f8")
+      tp_quant = np.frombuffer(zlib.decompressobj().decompress(payload[(8 + NumStations*8):].tobytes()), dtype="<u2").reshape(NumEM, NumStations)
+      tp_at_obs = np.where(tp_quant == Missing_Cube, np.nan, tp_quant / Scale) # Note: the division gives the closest float64 to the decimal values
+      
+      return tp_at_obs, obs_value
+
+
+#####################################
+# Inventory of the rainfall observations #
+#####################################
+
+# Note: each geopoints file with the rainfall observations is parsed only once, and stored as a record of a store
+# (keys: valid time at the end of the accumulation period as YYYYMMDDHH, and accumulation period). Each record 
+# contains the columns with the latitudes (float64), longitudes (float64), values (float64), and station ids (16 
+# bytes per station, empty if the geopoints do not contain them). The columns are read as zero-copy views.
+def ingest_OBS(FileStore, FileIN_OBS, ValidTime, Acc):
+
+      import metview as mv # Note: imported here, as only the scripts that parse the raw observations need metview
+
+      obs = mv.read(FileIN_OBS)
+      lats = np.asarray(mv.latitudes(obs), dtype="<f8")
+      lons = np.asarray(mv.longitudes(obs), dtype="<f8")
+      values = np.asarray(mv.values(obs), dtype="<f8")
+      stnids = mv.stnids(obs)
+      if stnids is None or len(stnids) != len(values):
+            stnids = [""] * len(values)
+      stnids = np.array(stnids, dtype="S16")
+      append_store(FileStore, ValidTime, Acc, len(values), 0, [lats, lons, values, stnids])
+
+def ingest_OBS_period(FileStore, DirIN_OBS, Acc, ValidTimeS, ValidTimeF, Disc_Step):
+      
+      store = open_store(FileStore)
+      ValidTime = ValidTimeS
+      while ValidTime <= ValidTimeF:
+            FileIN_OBS = DirIN_OBS + "/" + ValidTime.strftime("%Y%m%d") + "/tp" + f"{Acc:02d}" + "_obs_" + ValidTime.strftime("%Y%m%d%H") + ".geo"
+            if (int(ValidTime.strftime("%Y%m%d%H")), Acc) not in store["lookup"] and os.path.isfile(FileIN_OBS):
+                  print("Ingesting the rainfall observations in " + FileIN_OBS)
+                  ingest_OBS(FileStore, FileIN_OBS, int(ValidTime.strftime("%Y%m%d%H")), Acc)
+            ValidTime += timedelta(hours=Disc_Step)
+
+      return open_store(FileStore)
+
+def read_OBS(store, ValidTime, Acc):
+
+      payload, NumStations, NumEM = read_store(store, ValidTime, Acc)
+      obs = {}
+      obs["lat"] = payload[:(NumStations*8)].view("<f8")
+      obs["lon"] = payload[(NumStations*8):(NumStations*16)].view("<f8")
+      obs["value"] = payload[(NumStations*16):(NumStations*24)].view("<f8")
+      obs["stnid"] = payload[(NumStations*24):(NumStations*40)].view("S16")
+
+      return obs
+
+
+###########################################################
+# Multiplicity matrix of the bootstrapped days  #
+###########################################################
+
+# Note: the element [r, d] of the matrix contains how many times the day d is drawn (with replacement) in the
+# bootstrap replicate r. The first row corresponds to the original sample (i.e. each day drawn once).
+# Multiplying the matrix by the daily histograms (days x ((NumEM+1)*2)) gives the histograms of all replicates
+# with a single matrix product.
+# The replicates are drawn in blocks of BlockBS replicates, and each block has its own random stream, derived from 
+# the seed SeedBS and from a key (e.g. forecasting system, VRT, StepF) with numpy's SeedSequence. Thus, the 
+# replicates are the same whether the blocks are drawn serially or in parallel (in any order, on any machine).
+def rng_BS(SeedBS, Key, ind_Block):
+
+      spawn_key = tuple(zlib.crc32(str(elem).encode()) for elem in Key) + (ind_Block,)
+
+      return np.random.Generator(np.random.PCG64(np.random.SeedSequence(SeedBS, spawn_key=spawn_key)))
+
+def multiplicity_BS_block(NumDays, SeedBS, Key, ind_Block, NumReps):
+
+      if NumDays == 0:
+            return np.ones([NumReps, 0])
+      rng = rng_BS(SeedBS, Key, ind_Block)
+
+      return rng.multinomial(NumDays, np.full(NumDays, 1/NumDays), size=NumReps).astype(np.float64)
+
+def multiplicity_BS(NumDays, RepetitionsBS, SeedBS, Key, BlockBS=100):
+
+      multiplicity = np.ones([RepetitionsBS+1, NumDays])
+      for ind_Block in range((RepetitionsBS + BlockBS - 1) // BlockBS):
+            ind_S = ind_Block * BlockBS
+            ind_F = min(ind_S + BlockBS, RepetitionsBS)
+            multiplicity[(ind_S+1):(ind_F+1)] = multiplicity_BS_block(NumDays, SeedBS, Key, ind_Block, BlockBS)[:(ind_F - ind_S)]
+
+      return multiplicity
+
+def hist_BS(hist_days, multiplicity):
+
+      NumDays = hist_days.shape[0]
+      hist = multiplicity @ hist_days.reshape(NumDays, int(np.prod(hist_days.shape[1:]))).astype(np.float64)
+
+      return hist.reshape((multiplicity.shape[0],) + hist_days.shape[1:])
+
+# Note: the scores for the original sample and for the bootstrap replicates are computed block by block (with the 
+# same random streams as "multiplicity_BS"). If a tolerance is given, the drawing stops when the bounds of the 
+# confidence interval (with confidence level CL, in percent) change less than the tolerance after a new block, or 
+# when RepetitionsBS replicates are drawn. With a tolerance, the drawing never stops before MinReps replicates (which
+# must be fewer than RepetitionsBS), as the bounds estimated from the first blocks can look stable while the tail 
+# percentiles of a high CL (e.g. the 0.5th and 99.5th for CL=99) are still poorly sampled. The function "score" 
+# computes the scores from the histograms of the replicates (with the replicates on the last axis). The replicates 
+# not drawn are set to NaN.
+def adaptive_BS(hist_days, score, RepetitionsBS, SeedBS, Key, BlockBS, CL, Tol, MinReps):
+
+      if Tol is not None and MinReps >= RepetitionsBS:
+            raise ValueError("The minimum number of bootstrap repetitions (" + str(MinReps) + ") must be smaller than the maximum (" + str(RepetitionsBS) + ") when a tolerance is given")
+
+      NumDays = hist_days.shape[0]
+      alpha = 100 - CL # significance level (in %)
+      scores_list = [score(hist_BS(hist_days, np.ones([1, NumDays])))]
+      NumReps = 0
+      CI_old = None
+      for ind_Block in range((RepetitionsBS + BlockBS - 1) // BlockBS):
+            NumReps_Block = min(BlockBS, RepetitionsBS - NumReps)
+            multiplicity = multiplicity_BS_block(NumDays, SeedBS, Key, ind_Block, BlockBS)[:NumReps_Block]
+            scores_list.append(score(hist_BS(hist_days, multiplicity)))
+            NumReps += NumReps_Block
+            if Tol is not None:
+                  CI = np.percentile(np.concatenate(scores_list[1:], axis=-1), [alpha/2, 100 - (alpha/2)], axis=-1)
+                  if CI_old is not None and NumReps >= MinReps and np.allclose(CI, CI_old, rtol=0, atol=Tol, equal_nan=True):
+                        break
+                  CI_old = CI
+      
+      scores = np.full(scores_list[0].shape[:-1] + (RepetitionsBS+1,), np.nan)
+      scores[..., :(NumReps+1)] = np.concatenate(scores_list, axis=-1)
+
+      return scores, NumReps
+
+
+
+##################################################
+# Streaming bootstrap with Poisson weights #
+##################################################
+
+# Note: in the streaming bootstrap, each day enters each bootstrap replicate with a weight drawn from a Poisson 
+# distribution with mean 1 (instead of drawing exactly NumDays days with replacement), so each day can be folded into 
+# the accumulated histograms of all the replicates as soon as it is read, without keeping all the days in memory. 
+# The weights of a day depend only on the seed, on the key (e.g. forecasting system, VRT, StepF) and on the base 
+# date, so the same day always gets the same weights. Thus, the accumulators of separate sets of days (e.g. computed 
+# by separate jobs) can be merged by summing them, and a day can be removed by subtracting it. An accumulator 
+# contains the histograms of the original sample (first row) and of the replicates (int64), and the base dates 
+# accumulated. The accumulators for all the StepFs of a forecasting system and VRT are saved in a single ".npz" file.
+def weights_Poisson(SeedBS, Key, BaseDateTime, RepetitionsBS):
+
+      weights = np.ones(RepetitionsBS+1, dtype=np.int64)
+      weights[1:] = rng_BS(SeedBS, tuple(Key) + (BaseDateTime,), 0).poisson(1, RepetitionsBS)
+
+      return weights
+
+def new_accumulator(RepetitionsBS, NumEM):
+
+      return {"hist": np.zeros([RepetitionsBS+1, NumEM+1, 2], dtype=np.int64), "days": np.zeros(0, dtype=np.int64)}
+
+def add_day_accumulator(acc, hist_day, SeedBS, Key, BaseDateTime):
+
+      if BaseDateTime in acc["days"]:
+            raise ValueError("The base date " + str(BaseDateTime) + " is already in the accumulator")
+      weights = weights_Poisson(SeedBS, Key, BaseDateTime, acc["hist"].shape[0]-1)
+      acc["hist"] += weights.reshape(-1, 1, 1) * np.asarray(hist_day, dtype=np.int64)
+      acc["days"] = np.append(acc["days"], BaseDateTime)
+
+def remove_day_accumulator(acc, hist_day, SeedBS, Key, BaseDateTime):
+
+      if BaseDateTime not in acc["days"]:
+            raise ValueError("The base date " + str(BaseDateTime) + " is not in the accumulator")
+      weights = weights_Poisson(SeedBS, Key, BaseDateTime, acc["hist"].shape[0]-1)
+      acc["hist"] -= weights.reshape(-1, 1, 1) * np.asarray(hist_day, dtype=np.int64)
+      acc["days"] = acc["days"][acc["days"] != BaseDateTime]
+
+def merge_accumulators(acc_dict_list):
+
+      acc_dict_merged = {}
+      for acc_dict in acc_dict_list:
+            for StepF, acc in acc_dict.items():
+                  if StepF not in acc_dict_merged:
+                        acc_dict_merged[StepF] = {"hist": acc["hist"].copy(), "days": acc["days"].copy()}
+                  else:
+                        if np.intersect1d(acc_dict_merged[StepF]["days"], acc["days"]).size > 0:
+                              raise ValueError("The accumulators to merge share some base dates for StepF=" + str(StepF))
+                        acc_dict_merged[StepF]["hist"] += acc["hist"]
+                        acc_dict_merged[StepF]["days"] = np.append(acc_dict_merged[StepF]["days"], acc["days"])
+
+      return acc_dict_merged
+
+def save_accumulators(FileOUT, acc_dict):
+
+      DirOUT = os.path.dirname(FileOUT)
+      if not os.path.exists(DirOUT):
+            os.makedirs(DirOUT, exist_ok=True)
+      arrays = {}
+      for StepF, acc in acc_dict.items():
+            arrays["hist_" + f"{StepF:03d}"] = acc["hist"]
+            arrays["days_" + f"{StepF:03d}"] = acc["days"]
+      FileOUT_temp = FileOUT + "." + str(os.getpid()) + ".tmp"
+      with open(FileOUT_temp, "wb") as f:
+            np.savez(f, **arrays)
+      os.replace(FileOUT_temp, FileOUT)
+
+def load_accumulators(FileIN):
+
+      acc_dict = {}
+      with np.load(FileIN) as arrays:
+            for name in arrays.files:
+                  if name.startswith("hist_"):
+                        StepF = int(name[5:])
+                        acc_dict[StepF] = {"hist": arrays[name], "days": arrays["days_" + name[5:]]}
+
+      return acc_dict
+
+def scores_accumulators(acc_dict, NumEM):
+
+      # Computing BSrel, AROCt and AROCz for the original and the bootstrapped values of all StepFs (with the StepF in 
+      # column 0, the original value in column 1, and the bootstrapped values in the following columns)
+      StepF_list = sorted(acc_dict)
+      RepetitionsBS = acc_dict[StepF_list[0]]["hist"].shape[0] - 1 if len(StepF_list) > 0 else 0
+      BSrel_array = np.zeros([len(StepF_list), RepetitionsBS+2])
+      AROCt_array = np.zeros([len(StepF_list), RepetitionsBS+2])
+      AROCz_array = np.zeros([len(StepF_list), RepetitionsBS+2])
+      for ind_StepF in range(len(StepF_list)):
+            StepF = StepF_list[ind_StepF]
+            BSrel_array[ind_StepF, 0] = StepF
+            AROCt_array[ind_StepF, 0] = StepF
+            AROCz_array[ind_StepF, 0] = StepF
+            BSrel_array[ind_StepF, 1:] = BSrel_Ferro(acc_dict[StepF]["hist"], NumEM)
+            AROCt_array[ind_StepF, 1:], AROCz_array[ind_StepF, 1:] = AROCt_AROCz(acc_dict[StepF]["hist"])
+
+      return BSrel_array, AROCt_array, AROCz_array
+
+
+
+#######################################################################
+# Prefix-sum index of the daily histograms over base dates and StepFs #
+#######################################################################
+
+# Note: the element [i, j] of the prefix sums contains the sum of the daily histograms of the first i base dates and 
+# of the first j StepFs (the first row and column are zeros). Thus, the histogram for any window of consecutive base 
+# dates and StepFs (e.g. a season, and the StepFs of day 1 to 3) is computed with the sum of only four prefix sums, 
+# whatever the size of the window. The missing daily histograms count as zeros. The prefix sums are saved in a 
+# ".npz" file, together with the base dates (as YYYYMMDDHH) and the StepFs.
+def prefix_hist(hist_days_steps):
+
+      prefix = np.zeros((hist_days_steps.shape[0]+1, hist_days_steps.shape[1]+1) + hist_days_steps.shape[2:], dtype=np.int64)
+      prefix[1:, 1:] = np.cumsum(np.cumsum(hist_days_steps, axis=0, dtype=np.int64), axis=1)
+
+      return prefix
+
+def save_prefix(FileOUT, prefix, BaseDateTime_list, StepF_list):
+
+      DirOUT = os.path.dirname(FileOUT)
+      if not os.path.exists(DirOUT):
+            os.makedirs(DirOUT, exist_ok=True)
+      FileOUT_temp = FileOUT + "." + str(os.getpid()) + ".tmp"
+      with open(FileOUT_temp, "wb") as f:
+            np.savez(f, prefix=prefix, BaseDateTime=np.asarray(BaseDateTime_list, dtype=np.int64), StepF=np.asarray(StepF_list, dtype=np.int64))
+      os.replace(FileOUT_temp, FileOUT)
+
+def load_prefix(FileIN):
+
+      with np.load(FileIN) as arrays:
+            return {"prefix": arrays["prefix"], "BaseDateTime": arrays["BaseDateTime"], "StepF": arrays["StepF"]}
+
+def query_prefix(prefix_index, BaseDateTimeS, BaseDateTimeF, StepF_S, StepF_F):
+
+      # Converting the window (with the extremes included) into the positions of the prefix sums
+      ind_DateS = np.searchsorted(prefix_index["BaseDateTime"], BaseDateTimeS, side="left")
+      ind_DateF = np.searchsorted(prefix_index["BaseDateTime"], BaseDateTimeF, side="right")
+      ind_StepF_S = np.searchsorted(prefix_index["StepF"], StepF_S, side="left")
+      ind_StepF_F = np.searchsorted(prefix_index["StepF"], StepF_F, side="right")
+      
+      prefix = prefix_index["prefix"]
+      hist = prefix[ind_DateF, ind_StepF_F] - prefix[ind_DateS, ind_StepF_F] - prefix[ind_DateF, ind_StepF_S] + prefix[ind_DateS, ind_StepF_S]
+
+      return hist
+
+
+#####################################
+# Brier Score - Reliability component (BSrel) #
+#####################################
+
+# Note: To compute the BSrel values, we are using the equation present in:
+# Ferro, C.A. and Fricker, T.E., 2012. A bias‐corrected decomposition of the Brier score. Quarterly Journal of the Royal Meteorological Society, 138(668), pp.1954-1960. https://doi.org/10.1002/qj.1924
+# The BSrel values are computed from the joint histograms, vectorised over all leading dimensions (e.g. the
+# bootstrap replicates).
+def BSrel_Ferro(hist, NumEM):
+
+      Prob_Thr = np.arange(0, NumEM+1) / NumEM  # probability thresholds offered by the considered ensemble
+      Nk = hist.sum(axis=-1) # n. of forecasts for each probability threshold
+      Ok = hist[..., 1] # n. of observed events for each probability threshold
+      n = Nk.sum(axis=-1) # sample size
+
+      with np.errstate(divide="ignore", invalid="ignore"):
+            BSrel_k = np.where(Nk != 0, Nk * ((Prob_Thr - (Ok/Nk))**2), 0)
+            BSrel = BSrel_k.sum(axis=-1) / n
+
+      return BSrel
+
+
+########################################################################
+# Probabilistic contingency table, hit rates (HR) and false alarm rates (FAR) #
+########################################################################
+
+# Note: the contingency tables for all the probability thresholds are computed from the reverse cumulative sums of
+# the joint histograms. The index i of the thresholds corresponds to "yes" forecasts when at least (NumEM - i)
+# ensemble members exceed the VRT. All functions are vectorised over the leading dimensions of the histograms.
+def contingency_table(hist):
+
+      rev_cumsum = np.cumsum(hist[..., ::-1, :], axis=-2)
+      hits = rev_cumsum[..., 1] # hits
+      false_alarms = rev_cumsum[..., 0] # false alarms
+      misses = rev_cumsum[..., -1:, 1] - hits # misses
+      correct_negatives = rev_cumsum[..., -1:, 0] - false_alarms # correct negatives
+
+      return hits, false_alarms, misses, correct_negatives
+
+def real_HR_FAR(hist):
+
+      # Computing hit rates (hr) and false alarm rates (far).
+      hits, false_alarms, misses, correct_negatives = contingency_table(hist)
+      with np.errstate(divide="ignore", invalid="ignore"):
+            hr = hits / (hits + misses)  # hit rates
+            far = false_alarms / (false_alarms + correct_negatives)  # false alarms
+
+      # Adding the points (0,0) and (1,1) to the arrays to ensure the ROC curve is closed.
+      hr = np.insert(hr, 0, 0, axis=-1)
+      hr = np.insert(hr, -1, 1, axis=-1)
+      far = np.insert(far, 0, 0, axis=-1)
+      far = np.insert(far, -1, 1, axis=-1)
+
+      return hr, far
+
+
+###########################################
+# "Trapezoidal" Area Under the ROC curve (AROCt) #
+###########################################
+
+# Note: the computation of AROC values uses the trapezoidal approximation, and its value is approximated to the
+# second decimal digit.
+def AROC_trapezoidal(hist):
+
+      hr, far = real_HR_FAR(hist)
+      AROCt = np.sum((hr[..., 1:] + hr[..., :-1]) * np.diff(far, axis=-1) / 2, axis=-1)
+      AROCt = np.round(AROCt, 2)
+
+      return hr, far, AROCt
+
+
+##########################################
+# "Binormal" Area Under the ROC curve (AROCz)   #
+##########################################
+
+# Note: the linear regression between the z-scores of HRs and FARs is solved in closed form for all the leading
+# dimensions at once (e.g. all the bootstrap replicates), considering only the finite z-scores of each curve.
+def binormal_params(hr, far):
+
+      # Compute the inverse of the HRs and FARs with the binormal approximation
+      HRz_inv = norm.ppf(hr) # z-score for HR
+      FARz_inv = norm.ppf(far) # z-score for FAR
+      finite = np.isfinite(FARz_inv + HRz_inv) # index only finite values
+      HRz_inv = np.where(finite, HRz_inv, 0)
+      FARz_inv = np.where(finite, FARz_inv, 0)
+
+      # Apply linear regression (1) to define the parameters of the binormal model.
+      n = finite.sum(axis=-1)
+      Sx = FARz_inv.sum(axis=-1)
+      Sy = HRz_inv.sum(axis=-1)
+      Sxx = (FARz_inv**2).sum(axis=-1)
+      Sxy = (FARz_inv * HRz_inv).sum(axis=-1)
+      with np.errstate(divide="ignore", invalid="ignore"):
+            slope = (n*Sxy - Sx*Sy) / (n*Sxx - Sx**2)
+            intercept = (Sy - slope*Sx) / n
+
+      return slope, intercept
+
+def binormal_AROC(hr, far):
+
+      slope, intercept = binormal_params(hr, far)
+      AROCz = norm.cdf( (intercept*( (slope**2+1.)/2.)**(-0.5) )/(2.**(0.5)))
+
+      return AROCz
+
+def AROCt_AROCz(hist):
+
+      hr, far, AROCt = AROC_trapezoidal(hist)
+
+      return np.stack([AROCt, binormal_AROC(hr, far)])
+
+Z_Binormal = np.arange(-10,10,0.1) # sampling of the z-space for the "binormal" HRs and FARs
+
+def binormal_HR_FAR(hr, far):
+
+      # Compute the HRs and FARs with the binormal approximation (sampling the z-space)
+      slope, intercept = binormal_params(hr, far)
+      x = Z_Binormal
+      HRz = norm.cdf(np.multiply.outer(slope, x) + np.expand_dims(intercept, -1))
+      FARz = norm.cdf(x) * np.ones_like(HRz)
+
+      return HRz, FARz
+
+# Note: the "real" and "binormal" ROC curves of all the StepFs for a forecasting system and VRT are saved in a single 
+# ".npz" file, as fixed-shape arrays of StepFs x points (NaN for the StepFs not computed), together with the StepFs. 
+# Thus, the curves for all the StepFs are read with a single file opening, and the curve for a StepF is a row. The
+# "real" curves have NumEM+3 points (see "real_HR_FAR") and the "binormal" ones a point for each z in Z_Binormal.
+def new_ROC_curves(NumStepF, NumEM):
+
+      hr = np.full([NumStepF, NumEM+3], np.nan)
+      far = np.full([NumStepF, NumEM+3], np.nan)
+      hrz = np.full([NumStepF, len(Z_Binormal)], np.nan)
+      farz = np.full([NumStepF, len(Z_Binormal)], np.nan)
+
+      return hr, far, hrz, farz
+
+def save_ROC_curves(FileOUT, StepF_list, hr, far, hrz, farz):
+
+      DirOUT = os.path.dirname(FileOUT)
+      if not os.path.exists(DirOUT):
+            os.makedirs(DirOUT, exist_ok=True)
+      FileOUT_temp = FileOUT + "." + str(os.getpid()) + ".tmp"
+      with open(FileOUT_temp, "wb") as f:
+            np.savez(f, StepF=np.asarray(StepF_list, dtype=np.int64), HR=hr, FAR=far, HRz=hrz, FARz=farz)
+      os.replace(FileOUT_temp, FileOUT)
+
+def load_ROC_curves(FileIN):
+
+      with np.load(FileIN) as arrays:
+            return {"StepF": arrays["StepF"], "HR": arrays["HR"], "FAR": arrays["FAR"], "HRz": arrays["HRz"], "FARz": arrays["FARz"]}
+
+
+##############################################
+# Reliability and sharpness tables #
+##############################################
+
+# Note: the forecast probabilities offered by an ensemble with NumEM members are k/NumEM (k=0,...,NumEM). For each of 
+# them, the tables contain the observation relative frequency (NaN if no forecasts have that probability) and the 
+# forecast absolute frequency. The tables are computed from the joint histograms, vectorised over the leading 
+# dimensions (e.g. the bootstrap replicates).
+def reliability_table(hist, NumEM):
+
+      Prob_Thr = np.arange(0, NumEM+1) / NumEM
+      abs_freq_fc = hist.sum(axis=-1)
+      with np.errstate(divide="ignore", invalid="ignore"):
+            rel_freq_obs = np.where(abs_freq_fc > 0, hist[..., 1] / abs_freq_fc, np.nan)
+
+      return Prob_Thr, rel_freq_obs, abs_freq_fc
+
+# Note: the tables are computed for the original sample (first row of hist_BS) and for all the bootstrap replicates 
+# (following rows, see "hist_BS") at once. The confidence interval (with confidence level CL, in percent) of the 
+# observation relative frequency is computed from the replicates in which some forecasts have the probability (NaN if 
+# none, or if there are no replicates). The table contains the forecast probability (column 0), the observation 
+# relative frequency (column 1), the forecast absolute frequency (column 2), and the lower and upper bounds of the 
+# confidence interval (columns 3 and 4).
+def reliability_table_BS(hist_BS, NumEM, CL):
+
+      Prob_Thr, rel_freq_obs, abs_freq_fc = reliability_table(hist_BS, NumEM)
+      alpha = 100 - CL # significance level (in %)
+      if hist_BS.shape[0] > 1:
+            with warnings.catch_warnings():
+                  warnings.simplefilter("ignore", category=RuntimeWarning) # probabilities never forecast in the replicates
+                  CI = np.nanpercentile(rel_freq_obs[1:], [alpha/2, 100 - (alpha/2)], axis=0)
+      else:
+            CI = np.full([2, NumEM+1], np.nan)
+
+      return np.stack([Prob_Thr, rel_freq_obs[0], abs_freq_fc[0], CI[0], CI[1]], axis=-1)
+
+# Note: the tables of all the StepFs for a forecasting system and VRT are saved in a single ".npz" file, as an array of
+# StepFs x probabilities x 6 (see 12_Compute_BSrel_AROCt_AROCz_HR_FAR_Reliability_BS.py), together with the settings 
+# used to compute them (verification period, StepFs and bootstrap settings). Thus, a script reading the tables can 
+# check that they were computed with its own settings (e.g. after a change of the verification period), instead of 
+# using stale tables.
+def settings_reliability_tables(DateS, DateF, StepF_list, RepetitionsBS, SeedBS, BlockBS, CL):
+
+      return {"DateS": int(DateS.strftime("%Y%m%d%H")), "DateF": int(DateF.strftime("%Y%m%d%H")), "StepF": np.asarray(StepF_list, dtype=np.int64), 
+              "RepetitionsBS": RepetitionsBS, "SeedBS": SeedBS, "BlockBS": BlockBS, "CL": CL}
+
+def save_reliability_tables(FileOUT, reliability, settings):
+
+      DirOUT = os.path.dirname(FileOUT)
+      if not os.path.exists(DirOUT):
+            os.makedirs(DirOUT, exist_ok=True)
+      FileOUT_temp = FileOUT + "." + str(os.getpid()) + ".tmp"
+      with open(FileOUT_temp, "wb") as f:
+            np.savez(f, Reliability=reliability, **{"Settings_" + key: np.asarray(value) for key, value in settings.items()})
+      os.replace(FileOUT_temp, FileOUT)
+
+def load_reliability_tables(FileIN):
+
+      with np.load(FileIN) as arrays:
+            return arrays["Reliability"], {key[len("Settings_"):]: arrays[key] for key in arrays.files if key.startswith("Settings_")}
+
+def match_reliability_tables(FileIN, settings):
+
+      if not os.path.isfile(FileIN):
+            return False
+      settings_FileIN = load_reliability_tables(FileIN)[1]
+      return set(settings_FileIN) == set(settings) and all(np.array_equal(settings_FileIN[key], np.asarray(value)) for key, value in settings.items())